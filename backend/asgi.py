@@ -12,3 +12,10 @@ application = ProtocolTypeRouter({
         URLRouter(websocket_urlpatterns)
     ),
 })
+
+# Load and warm up the streaming models in the background instead of on import.
+# In process mode the inference workers load their own copies, so skip it here
+from django.conf import settings
+if getattr(settings, "CAMERA_MODEL_PRELOAD", True) and getattr(settings, "CAMERA_INFERENCE_MODE", "thread") != "process":
+    from cameras.registry import get_registry
+    get_registry().preload()
@@ -0,0 +1,28 @@
+import threading
+
+from django.conf import settings
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis_client():
+    """
+    Redis client for the server the channel layer already uses
+    (the first host in CHANNEL_LAYERS["default"]).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import redis
+
+                host = settings.CHANNEL_LAYERS["default"]["CONFIG"]["hosts"][0]
+                if isinstance(host, str):
+                    _client = redis.Redis.from_url(host)
+                elif isinstance(host, dict):
+                    _client = redis.Redis.from_url(host["address"]) if "address" in host else redis.Redis(**host)
+                else:
+                    _client = redis.Redis(host=host[0], port=host[1])
+    return _client
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from pymongo import MongoClient
 from urllib.parse import quote_plus
@@ -137,6 +138,7 @@ password = quote_plus("BU@#8826613045")  # special characters will be escaped
 # CAMERA_COLLECTION = MONGO_DB["cameras"]
 # LOGS_COLLECTION = MONGO_DB["logs"]
 # FRAMES_COLLECTION = MONGO_DB["frames"]
+# ROLLUPS_COLLECTION = MONGO_DB["threat_rollups"]  # defaults to "threat_rollups" next to LOGS_COLLECTION
 
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
@@ -156,3 +158,116 @@ CHANNEL_LAYERS = {
         },
     },
 }
+
+# Detection services
+DETECTION_WORKERS = 8  # threads shared by all remote detector calls
+DETECTION_MODEL_DEADLINE = 10.0  # seconds before a model is dropped from /threats/
+DETECTION_MODEL_DEADLINES = {
+    # per-model overrides, e.g. "emotion": 5.0
+}
+DETECTION_BATCH_CONCURRENCY = 4  # images in flight at once across /threats/batch/ requests
+
+# Asynchronous detection jobs (/threats/jobs/)
+DETECTION_JOB_WORKERS = 4  # background threads draining the job queue
+DETECTION_JOB_MAX_PENDING = 1000  # submissions beyond this get 503
+DETECTION_JOB_MAX_PENDING_BYTES = 256 * 1024 * 1024  # ...as do submissions past this many bytes of queued images
+DETECTION_JOB_RESULT_TTL = 300.0  # seconds a finished job can still be polled
+DETECTION_JOB_RECHECK_WINDOW = 10.0  # a camera's jobs run at high priority this long after a threat
+DETECTION_JOB_STORE = "memory"  # "memory" (poll the same process) or "redis" (any worker can answer)
+
+# Roboflow inference client
+ROBOFLOW_API_URL = os.getenv("ROBOFLOW_API_URL", "https://detect.roboflow.com")
+ROBOFLOW_API_KEY = os.getenv("ROBOFLOW_API_KEY", "nob2A5RQmN6iKyQFIsC5")
+ROBOFLOW_MODELS = {
+    # "api_key", "timeout", "upload_size" and "upload_quality" may be set per model
+    "knife": {"model_id": "hazard-detection-z59i7/10"},
+    "gun": {"model_id": "gun-detection-ghlzd/4"},
+    "mask": {"model_id": "face-mask-detection-2gpmy/1"},
+    "emotion": {"model_id": "emotion-detection-naapm/3"},
+}
+DETECTION_HTTP_POOL_SIZE = None  # keep-alive connections; defaults to DETECTION_WORKERS
+DETECTION_HTTP_TIMEOUT = (3.05, 10)  # (connect, read) seconds; each attempt is also cut to the model's remaining deadline
+DETECTION_HTTP_RETRIES = 2  # extra attempts on connection errors, 429 and 5xx
+DETECTION_HTTP_BACKOFF = 0.2  # base seconds for jittered exponential backoff
+
+# Frames are downscaled and re-encoded before upload; boxes are mapped back
+DETECTION_UPLOAD_ENABLED = True
+DETECTION_UPLOAD_SIZE = 640  # longest side sent to Roboflow
+DETECTION_UPLOAD_QUALITY = 80  # JPEG quality of the re-encoded frame
+
+# Where each HTTP detector runs: "remote" (Roboflow), "local" (the cameras app's
+# YOLO weights, in process) or "local_first" (local, Roboflow if it fails).
+# Only knife, gun and mask have local models; emotion is always remote.
+DETECTION_BACKENDS = {
+    "knife": "remote",
+    "gun": "remote",
+    "mask": "remote",
+    "emotion": "remote",
+}
+
+# Per-model circuit breakers and hedged requests for the remote detectors
+DETECTION_BREAKER_ENABLED = True
+DETECTION_BREAKER_WINDOW = 20  # recent calls considered per model
+DETECTION_BREAKER_MIN_CALLS = 10  # calls needed before the breaker may trip
+DETECTION_BREAKER_ERROR_RATE = 0.5  # trip when this share of recent calls failed...
+DETECTION_BREAKER_SLOW_CALL = 5.0  # ...or when calls slower than this many seconds
+DETECTION_BREAKER_SLOW_RATE = 0.5  # ...make up this share
+DETECTION_BREAKER_OPEN_SECONDS = 30.0  # fail fast this long before probing again
+DETECTION_HEDGE_PERCENTILE = None  # e.g. 95: send a backup request once the p95 latency has passed
+DETECTION_HEDGE_MIN_SAMPLES = 20  # successful calls needed before hedging starts
+
+# Perceptual-hash result cache for /threats/ (per camera, per model)
+DETECTION_CACHE_ENABLED = True
+DETECTION_CACHE_MAX_ENTRIES = 1024  # LRU bound across all cameras and models
+DETECTION_CACHE_TTL = 5.0  # seconds a cached prediction stays reusable
+DETECTION_CACHE_TOLERANCE = 4  # max Hamming distance (of 64 bits) for a near-duplicate
+
+# Motion gating in front of the CameraConsumer YOLO models
+CAMERA_GATE_ENABLED = True
+CAMERA_GATE_THRESHOLD = 4.0  # mean abs grayscale difference (0-255) that counts as a change
+CAMERA_GATE_REFRESH_SECONDS = 5.0  # force an inference at least this often
+CAMERA_GATE_SIZE = (64, 36)  # thumbnail the difference is computed on
+
+# Dedicated executor for the CameraConsumer YOLO models
+CAMERA_INFERENCE_MODE = "thread"  # "thread" or "process"
+CAMERA_INFERENCE_WORKERS = None  # process mode: defaults to half the cores; thread mode: at most 2
+CAMERA_INFERENCE_TORCH_THREADS = None  # process mode: cores // workers; thread mode: cores // models predicting at once
+CAMERA_INFERENCE_MAX_PENDING = None  # queued + running jobs before frames are shed; defaults to 2 x workers
+
+# Cross-camera micro-batching of YOLO inference
+CAMERA_BATCH_ENABLED = True
+CAMERA_BATCH_WINDOW_MS = 10  # how long to wait for more frames after the first
+CAMERA_BATCH_MAX_SIZE = 8  # frames per batch
+
+# Streaming YOLO model registry (weights are relative to cameras/weights/)
+CAMERA_MODELS = {
+    # "backend" may be set per model to override CAMERA_INFERENCE_BACKEND
+    "face_mask": {"weights": "face_mask_best.pt"},
+    "weapon": {"weights": "knife_detector.pt"},
+}
+CAMERA_INPUT_SIZE = 640  # square model input, multiple of 32
+CAMERA_MODEL_PRELOAD = True  # load in the background when the ASGI app starts
+CAMERA_MODEL_WARMUP_RUNS = 1  # dummy inferences before a model is served
+CAMERA_INFERENCE_BACKEND = "torch"  # "torch", "onnx" or "onnx-int8" (needs onnxruntime)
+CAMERA_REDUCED_DECODE = True  # decode JPEGs at 1/2, 1/4 or 1/8 scale when still >= CAMERA_INPUT_SIZE
+
+# Detection broadcasts to viewers
+CAMERA_BROADCAST_MODE = "full"  # "full" or "delta" (added/changed/removed with keyframes)
+CAMERA_BROADCAST_KEYFRAME_INTERVAL = 30  # messages between full keyframes in delta mode
+CAMERA_LOCAL_FANOUT = True  # deliver to same-process consumers directly; Redis only for other processes
+CAMERA_FANOUT_MEMBERSHIP_TTL = 2.0  # seconds the per-process group membership counts are cached
+CAMERA_FANOUT_REFRESH_INTERVAL = 30.0  # seconds between rewrites of this process's group memberships and counts
+CAMERA_FANOUT_MEMBERSHIP_EXPIRY = 90.0  # counts not rewritten for this long belong to a dead process and are ignored
+
+# Multi-object tracking across frames in CameraConsumer
+CAMERA_TRACKING_ENABLED = True  # persistent track_id / track_age on every detection
+CAMERA_DETECT_EVERY_N = 1  # run inference every Nth frame and propagate tracks in between
+
+# Background batched writer for detection logs and camera counters
+LOG_WRITER_BATCH_SIZE = 200  # flush once this many log entries are buffered
+LOG_WRITER_FLUSH_INTERVAL = 1.0  # ...or after this many seconds
+LOG_WRITER_MAX_QUEUE = 10000  # oldest entries are dropped beyond this
+
+# Throttle for "safe" status log entries
+SAFE_LOG_INTERVAL = 30.0  # seconds between safe entries per camera
+SAFE_LOG_BACKEND = "memory"  # "memory" (per process) or "redis" (shared via the channel-layer Redis)
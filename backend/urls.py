@@ -22,4 +22,7 @@ urlpatterns = [
 
     # include your cameras app API
     path('api/', include('cameras.urls')),
+
+    # detection endpoints (threats, logs, stats, ...)
+    path('api/detection/', include('detection.urls')),
 ]
\ No newline at end of file
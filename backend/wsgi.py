@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# HTTP detectors served by local models (DETECTION_BACKENDS) load them in the background
+from django.conf import settings
+if any(backend != "remote" for backend in getattr(settings, "DETECTION_BACKENDS", {}).values()):
+    from cameras.registry import get_registry
+    get_registry().preload()
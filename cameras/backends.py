@@ -0,0 +1,196 @@
+import ast
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+class TorchBackend:
+    """Ultralytics YOLO in PyTorch eager mode"""
+
+    name = "torch"
+
+    def __init__(self, weights, input_size=640):
+        from ultralytics import YOLO
+
+        self.weights = Path(weights)
+        self.input_size = input_size
+        self.model = YOLO(str(self.weights))
+        self.names = self.model.names
+
+    def predict(self, batch, conf=0.25, iou=0.45):
+        """
+        Run the model over a preprocessed RGB BCHW float batch.
+        Returns one ``(N, 6)`` array of ``x1, y1, x2, y2, conf, cls`` per image,
+        in model input coordinates.
+        """
+        import torch
+
+        tensor = torch.from_numpy(batch)
+        results = self.model(tensor, imgsz=self.input_size, conf=conf, iou=iou, verbose=False)
+        return [result.boxes.data.cpu().numpy() for result in results]
+
+
+class OnnxBackend:
+    """
+    YOLO exported to ONNX and run with ONNX Runtime on CPU, optionally with
+    INT8 dynamic-quantized weights. The export is cached next to the ``.pt``
+    file and redone when the weights are newer than the export.
+    """
+
+    name = "onnx"
+
+    def __init__(self, weights, input_size=640, quantize=False, threads=0):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnx inference backend needs the onnxruntime package") from e
+
+        self.weights = Path(weights)
+        self.input_size = input_size
+        self.quantized = quantize
+        if self.weights.suffix == ".onnx":
+            path = self.weights
+        else:
+            path = export_onnx(self.weights, input_size)
+        if quantize:
+            path = quantize_onnx(path)
+        self.onnx_path = path
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+        # Ultralytics stores the class names as a dict literal in the model metadata
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+
+    def predict(self, batch, conf=0.25, iou=0.45):
+        """Same contract as ``TorchBackend.predict``."""
+        output = self.session.run(None, {self.input_name: batch.astype(np.float32, copy=False)})[0]
+        # (B, 4 + classes, anchors) -> one (anchors, 4 + classes) array per image
+        return [self._postprocess(preds.T, conf, iou) for preds in output]
+
+    def _postprocess(self, preds, conf, iou):
+        scores = preds[:, 4:]
+        classes = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), classes]
+        keep = confidences >= conf
+        if not keep.any():
+            return np.zeros((0, 6), dtype=np.float32)
+
+        cx, cy, w, h = preds[keep, :4].T
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        confidences, classes = confidences[keep], classes[keep]
+
+        # Class-aware NMS: offset each class so boxes of different classes never overlap
+        offset = classes[:, None] * (self.input_size * 2)
+        shifted = boxes + offset
+        rects = np.concatenate([shifted[:, :2], shifted[:, 2:] - shifted[:, :2]], axis=1)
+        indices = cv2.dnn.NMSBoxes(rects.tolist(), confidences.tolist(), conf, iou)
+        indices = np.array(indices, dtype=int).reshape(-1)
+
+        return np.concatenate(
+            [boxes[indices], confidences[indices, None], classes[indices, None].astype(np.float32)],
+            axis=1,
+        ).astype(np.float32)
+
+
+def export_onnx(weights, input_size=640):
+    """Export ``weights`` to ONNX with a dynamic batch axis; returns the ONNX path."""
+    weights = Path(weights)
+    target = weights.with_name(f"{weights.stem}_{input_size}.onnx")
+    if target.exists() and target.stat().st_mtime >= weights.stat().st_mtime:
+        return target
+
+    from ultralytics import YOLO
+
+    print(f"Exporting {weights.name} to ONNX at {input_size}px...")
+    exported = Path(YOLO(str(weights)).export(format="onnx", imgsz=input_size, dynamic=True, simplify=True))
+    exported.replace(target)
+    return target
+
+
+def quantize_onnx(onnx_path):
+    """INT8 dynamic quantization of an ONNX export; returns the quantized path."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    onnx_path = Path(onnx_path)
+    target = onnx_path.with_name(f"{onnx_path.stem}.int8.onnx")
+    if target.exists() and target.stat().st_mtime >= onnx_path.stat().st_mtime:
+        return target
+
+    print(f"Quantizing {onnx_path.name} to INT8...")
+    quantize_dynamic(str(onnx_path), str(target), weight_type=QuantType.QUInt8)
+    return target
+
+
+def create_backend(weights, backend="torch", input_size=640, threads=0):
+    """Build the inference backend named ``backend`` ("torch", "onnx" or "onnx-int8")."""
+    if backend == "torch":
+        return TorchBackend(weights, input_size)
+    if backend == "onnx":
+        return OnnxBackend(weights, input_size, threads=threads)
+    if backend == "onnx-int8":
+        return OnnxBackend(weights, input_size, quantize=True, threads=threads)
+    raise ValueError(f"Unknown inference backend: {backend}")
+
+
+def box_iou(a, b):
+    """IoU of two ``x1, y1, x2, y2`` boxes"""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(ix2 - ix1, 0) * max(iy2 - iy1, 0)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def check_parity(reference, candidate, batches, conf=0.25, iou_threshold=0.5):
+    """
+    Compare ``candidate`` detections against ``reference`` (normally the torch
+    backend) on preprocessed batches. A reference box counts as matched when
+    the candidate has a box of the same class with IoU >= ``iou_threshold``.
+    """
+    matched = total = extra = 0
+    conf_deltas = []
+    timings = {reference.name: 0.0, candidate.name: 0.0}
+
+    for batch in batches:
+        started = time.perf_counter()
+        expected = reference.predict(batch, conf=conf)
+        timings[reference.name] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        actual = candidate.predict(batch, conf=conf)
+        timings[candidate.name] += time.perf_counter() - started
+
+        for ref_boxes, cand_boxes in zip(expected, actual):
+            used = set()
+            for ref in ref_boxes:
+                total += 1
+                best, best_iou = None, iou_threshold
+                for idx, cand in enumerate(cand_boxes):
+                    if idx in used or int(cand[5]) != int(ref[5]):
+                        continue
+                    overlap = box_iou(ref[:4], cand[:4])
+                    if overlap >= best_iou:
+                        best, best_iou = idx, overlap
+                if best is not None:
+                    used.add(best)
+                    matched += 1
+                    conf_deltas.append(abs(float(ref[4]) - float(cand_boxes[best][4])))
+            extra += len(cand_boxes) - len(used)
+
+    return {
+        "reference_boxes": total,
+        "matched": matched,
+        "recall": round(matched / total, 3) if total else 1.0,
+        "extra_boxes": extra,
+        "mean_conf_delta": round(float(np.mean(conf_deltas)), 4) if conf_deltas else 0.0,
+        "seconds": {name: round(value, 3) for name, value in timings.items()},
+    }
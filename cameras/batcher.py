@@ -0,0 +1,102 @@
+import asyncio
+
+from django.conf import settings
+
+from cameras.executor import get_executor
+from cameras.inference import detect_batch
+
+
+class MicroBatcher:
+    """
+    Process-wide micro-batcher for YOLO inference.
+
+    Frames submitted by every connected streamer are collected for up to
+    ``window`` seconds or ``max_batch`` frames, run through ``fn`` as one
+    batch on the inference executor, and the per-frame results are routed
+    back to the consumer that submitted each frame.
+    """
+
+    def __init__(self, fn, window=0.01, max_batch=8):
+        self.fn = fn
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.frames = 0
+        self._loop = None
+        self._queue = None
+        self._collector = None
+        self._running = set()
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._collector is None or self._collector.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._collector = loop.create_task(self._collect())
+
+    async def submit(self, frame):
+        """Queue ``frame`` for the next batch and wait for its detections."""
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._queue.put_nowait((frame, future))
+        return await future
+
+    async def _collect(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Keep collecting the next batch while this one runs
+            task = self._loop.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        # Consumers that disconnected while waiting have cancelled their futures
+        batch = [(frame, future) for frame, future in batch if not future.done()]
+        if not batch:
+            return
+
+        try:
+            results = await get_executor().run(self.fn, [frame for frame, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.frames += len(batch)
+        for (_, future), detections in zip(batch, results):
+            if not future.done():
+                future.set_result(detections)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "mean_batch": round(self.frames / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+_batcher = None
+
+
+def get_batcher():
+    """Process-wide batcher over ``detect_batch`` configured from settings."""
+    global _batcher
+    if _batcher is None:
+        _batcher = MicroBatcher(
+            detect_batch,
+            window=getattr(settings, "CAMERA_BATCH_WINDOW_MS", 10) / 1000,
+            max_batch=getattr(settings, "CAMERA_BATCH_MAX_SIZE", 8),
+        )
+    return _batcher
@@ -0,0 +1,111 @@
+import json
+from itertools import count
+
+from cameras.backends import box_iou
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used when orjson is not installed
+    orjson = None
+
+
+def dumps(data):
+    """Serialize a websocket message to text, with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, separators=(",", ":"))
+
+
+class DeltaEncoder:
+    """
+    Turns a camera's per-frame detection lists into compact broadcasts.
+
+    Every detection gets a stable ``id``: its ``track_id`` when the camera
+    is tracked, otherwise a greedy IoU match against the previous frame's
+    detections of the same type and class. Most messages
+    are ``detections_delta`` messages listing only added, changed and removed
+    detections; every ``keyframe_interval`` messages, or when a keyframe is
+    requested for a late joiner, the full list is sent instead.
+    """
+
+    def __init__(self, keyframe_interval=30, match_iou=0.3, move_tolerance=2, conf_tolerance=0.02):
+        self.keyframe_interval = keyframe_interval
+        self.match_iou = match_iou
+        self.move_tolerance = move_tolerance
+        self.conf_tolerance = conf_tolerance
+        self.seq = 0
+        self._ids = count(1)
+        self._last = {}  # id -> detection as last broadcast
+        self._keyframe_requested = True
+
+    def request_keyframe(self):
+        self._keyframe_requested = True
+
+    def assign_ids(self, detections):
+        """Give each detection the id of its best match in the previous frame, or a new one"""
+        unmatched = dict(self._last)
+        for detection in detections:
+            if "track_id" in detection:
+                # Tracked detections already carry a persistent id
+                detection["id"] = detection["track_id"]
+            if "id" in detection:
+                unmatched.pop(detection["id"], None)
+                continue
+            best, best_iou = None, self.match_iou
+            for det_id, previous in unmatched.items():
+                if previous["type"] != detection["type"] or previous["class"] != detection["class"]:
+                    continue
+                overlap = box_iou(previous["bbox"], detection["bbox"])
+                if overlap >= best_iou:
+                    best, best_iou = det_id, overlap
+            if best is None:
+                detection["id"] = next(self._ids)
+            else:
+                detection["id"] = best
+                del unmatched[best]
+        return detections
+
+    def _changed(self, previous, detection):
+        if previous.get("severity") != detection.get("severity"):
+            return True
+        if abs(previous["confidence"] - detection["confidence"]) > self.conf_tolerance:
+            return True
+        return any(abs(a - b) > self.move_tolerance for a, b in zip(previous["bbox"], detection["bbox"]))
+
+    def encode(self, detections):
+        """
+        Return the message to broadcast for this frame, or None when nothing
+        changed since the last broadcast.
+        """
+        detections = self.assign_ids(detections)
+        current = {detection["id"]: detection for detection in detections}
+
+        if self._keyframe_requested or self.seq % self.keyframe_interval == 0:
+            self._keyframe_requested = False
+            self._last = current
+            self.seq += 1
+            return {"action": "detections", "keyframe": True, "seq": self.seq, "detections": detections}
+
+        added = [d for det_id, d in current.items() if det_id not in self._last]
+        changed = [
+            d for det_id, d in current.items()
+            if det_id in self._last and self._changed(self._last[det_id], d)
+        ]
+        removed = [det_id for det_id in self._last if det_id not in current]
+        if not (added or changed or removed):
+            return None
+
+        # Unchanged detections keep their last broadcast state as the baseline
+        for detection in added + changed:
+            self._last[detection["id"]] = detection
+        for det_id in removed:
+            del self._last[det_id]
+
+        self.seq += 1
+        return {
+            "action": "detections_delta",
+            "seq": self.seq,
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+        }
@@ -1,40 +1,18 @@
 import json
-import cv2
-import numpy as np
-import base64
-import torch
 from channels.generic.websocket import AsyncWebsocketConsumer
-from pathlib import Path
 import asyncio
-from ultralytics import YOLO
 from datetime import datetime
-
-
-# Load YOLO models at startup
-BASE_DIR = Path(__file__).resolve().parent.parent
-WEIGHTS_DIR = BASE_DIR / "cameras" / "weights"
-
-# Load models
-face_mask_model = YOLO(str(WEIGHTS_DIR / "face_mask_best.pt"))
-weapon_model = YOLO(str(WEIGHTS_DIR / "knife_detector.pt"))
-
-print("✅ YOLOv11 Models loaded successfully!")
-
-# Set different confidence thresholds per detection type
-CONFIDENCE_THRESHOLDS = {
-    "face_mask": 0.5,
-    "gun": 0.6,      # Higher threshold to reduce false positives
-    "knife": 0.55,   # Slightly higher
-    "blood": 0.7,    # Much higher to prevent false blood detections
-}
-
-# Default model confidence (will be overridden per class)
-face_mask_model.conf = 0.5
-weapon_model.conf = 0.5
-
-# Print model class names for debugging
-print(f"Face Mask Model Classes: {face_mask_model.names}")
-print(f"Weapon Model Classes: {weapon_model.names}")
+from django.conf import settings
+from cameras.gating import get_gate, drop_gate
+from cameras.mailbox import FrameMailbox
+from cameras.inference import detect_objects
+from cameras.executor import get_executor, InferenceQueueFull
+from cameras.batcher import get_batcher
+from cameras.protocol import parse_frame, decode_data_url, ProtocolError
+from cameras.decode import FrameDecoder, scale_detections
+from cameras.broadcast import DeltaEncoder, dumps
+from cameras.tracking import Tracker
+from cameras.hub import get_hub, viewers_group, streamers_group
 
 
 class CameraConsumer(AsyncWebsocketConsumer):
@@ -42,25 +20,39 @@ class CameraConsumer(AsyncWebsocketConsumer):
         await self.accept()
         self.camera_id = None
         self.role = None  # 'streamer' or 'viewer'
+        self.camera_name = "Unknown Camera"
+        self.encoder = None  # DeltaEncoder for compact broadcasts (streamers only)
+        self.tracker = Tracker() if getattr(settings, "CAMERA_TRACKING_ENABLED", True) else None
+        self.frames_since_detection = 0
+        self.gate_keys = set()  # keys this consumer's frames were gated under
         self.detection_task = None
+        self.mailbox = FrameMailbox()
+        self.decoder = FrameDecoder(
+            target_size=getattr(settings, "CAMERA_INPUT_SIZE", 640),
+            reduced=getattr(settings, "CAMERA_REDUCED_DECODE", True)
+        )
         print(f"WebSocket connected: {self.channel_name}")
 
     async def disconnect(self, close_code):
         # Stop detection task if running
         if self.detection_task:
             self.detection_task.cancel()
+
+        # Frames sent before streamer_join are gated under the channel name
+        for key in self.gate_keys:
+            drop_gate(key)
             
         if self.camera_id:
-            # Leave the camera group
-            await self.channel_layer.group_discard(
-                f"camera_{self.camera_id}",
-                self.channel_name
-            )
+            # Leave the camera groups
+            for group in self.camera_groups():
+                await get_hub().leave(group, self)
             
-            # Notify others about disconnection
+            # Notify viewers about disconnection
             if self.role == "streamer":
-                await self.channel_layer.group_send(
-                    f"camera_{self.camera_id}",
+                drop_gate(self.camera_id)
+                await get_hub().send(
+                    self.channel_layer,
+                    viewers_group(self.camera_id),
                     {
                         "type": "streamer_left",
                         "camera_id": self.camera_id
@@ -68,7 +60,18 @@ class CameraConsumer(AsyncWebsocketConsumer):
                 )
         print(f"WebSocket disconnected: {self.channel_name}")
 
-    async def receive(self, text_data):
+    def camera_groups(self):
+        """The camera group (job results) plus the subgroup for this consumer's role"""
+        # Not "groups": channels iterates that class attribute on connect/disconnect
+        role_group = streamers_group(self.camera_id) if self.role == "streamer" else viewers_group(self.camera_id)
+        return [f"camera_{self.camera_id}", role_group]
+
+    async def receive(self, text_data=None, bytes_data=None):
+        # Binary messages are raw JPEG frames (see cameras/protocol.py)
+        if bytes_data is not None:
+            await self.receive_frame_bytes(bytes_data)
+            return
+
         try:
             data = json.loads(text_data)
             action = data.get("action")
@@ -79,13 +82,15 @@ class CameraConsumer(AsyncWebsocketConsumer):
             if action == "streamer_join":
                 self.camera_id = data["camera_id"]
                 self.role = "streamer"
-                
-                # Join camera group
-                await self.channel_layer.group_add(
-                    f"camera_{self.camera_id}",
-                    self.channel_name
+                self.camera_name = data.get("camera_name", self.camera_name)
+                self.encoder = DeltaEncoder(
+                    keyframe_interval=getattr(settings, "CAMERA_BROADCAST_KEYFRAME_INTERVAL", 30)
                 )
                 
+                # Join camera groups; same-process members are reached directly
+                for group in self.camera_groups():
+                    await get_hub().join(group, self)
+                
                 await self.send(text_data=json.dumps({
                     "action": "streamer_joined",
                     "camera_id": self.camera_id,
@@ -99,22 +104,22 @@ class CameraConsumer(AsyncWebsocketConsumer):
                 frame_data = data.get("frame")
                 camera_name = data.get("camera_name", "Unknown Camera")
                 if frame_data:
-                    await self.process_frame(frame_data, camera_name)
+                    meta = {"seq": data.get("seq"), "captured_at": data.get("captured_at")}
+                    self.queue_frame(frame_data, camera_name, meta)
 
             # ---------- Viewer joins ----------
             elif action == "viewer_join":
                 self.camera_id = data["camera_id"]
                 self.role = "viewer"
                 
-                # Join camera group
-                await self.channel_layer.group_add(
-                    f"camera_{self.camera_id}",
-                    self.channel_name
-                )
+                # Join camera groups; same-process members are reached directly
+                for group in self.camera_groups():
+                    await get_hub().join(group, self)
                 
                 # Notify streamer that viewer joined
-                await self.channel_layer.group_send(
-                    f"camera_{self.camera_id}",
+                await get_hub().send(
+                    self.channel_layer,
+                    streamers_group(self.camera_id),
                     {
                         "type": "viewer_joined",
                         "viewer_channel": self.channel_name,
@@ -178,173 +183,165 @@ class CameraConsumer(AsyncWebsocketConsumer):
                 "message": str(e)
             }))
 
-    async def process_frame(self, frame_data, camera_name):
-        """Process video frame for object detection"""
+    async def receive_frame_bytes(self, bytes_data):
+        """Queue a binary frame message from a streamer"""
         try:
-            # Decode base64 image
-            img_data = base64.b64decode(frame_data.split(',')[1])
-            nparr = np.frombuffer(img_data, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            frame = parse_frame(bytes_data)
+        except ProtocolError as e:
+            await self.send(text_data=json.dumps({
+                "action": "error",
+                "message": str(e)
+            }))
+            return
+
+        if self.role != "streamer" or frame.camera_id != str(self.camera_id):
+            await self.send(text_data=json.dumps({
+                "action": "error",
+                "message": "Binary frames require streamer_join for the same camera"
+            }))
+            return
+
+        meta = {"seq": frame.sequence, "captured_at": frame.captured_at}
+        self.queue_frame(frame.jpeg, self.camera_name, meta)
+
+    def queue_frame(self, frame_data, camera_name, meta):
+        """Latest frame wins: replace any frame still waiting and let a single
+        worker run inference for this camera"""
+        self.mailbox.put((frame_data, camera_name, meta))
+        if self.detection_task is None:
+            self.detection_task = asyncio.create_task(self.frame_worker())
+
+    async def frame_worker(self):
+        """Drain the frame mailbox, one inference at a time"""
+        while True:
+            frame_data, camera_name, meta = await self.mailbox.get()
+            await self.process_frame(frame_data, camera_name, meta)
+
+    async def process_frame(self, frame_data, camera_name, meta=None):
+        """Process a video frame (raw JPEG bytes or a base64 data URL) for object detection"""
+        try:
+            # Binary frames are already raw bytes; legacy JSON frames are base64
+            img_data = decode_data_url(frame_data) if isinstance(frame_data, str) else frame_data
+            # Decode at the smallest scale the model input allows
+            frame, scale = self.decoder.decode(img_data)
             
             if frame is None:
                 return
             
-            # Run detection in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            detections = await loop.run_in_executor(None, self.detect_objects, frame)
+            # Skip inference on unchanged scenes and re-emit the last detections
+            gate_key = self.camera_id or self.channel_name
+            self.gate_keys.add(gate_key)
+            gate = get_gate(gate_key)
+            gated = getattr(settings, "CAMERA_GATE_ENABLED", True) and not gate.should_infer(frame)
+            timings = {}
+            detect_every = getattr(settings, "CAMERA_DETECT_EVERY_N", 1)
+            if gated:
+                detections = gate.last_detections
+            elif self.tracker and self.tracker.tracks and self.frames_since_detection + 1 < detect_every:
+                # Between full inferences, propagate the existing tracks; the gate
+                # keeps its reference frame until the next inference is recorded
+                self.frames_since_detection += 1
+                detections = self.tracker.predict()
+            else:
+                # Run detection on the bounded inference executor, batched with
+                # other cameras' frames; when it is saturated the frame is shed
+                # rather than queued
+                try:
+                    if getattr(settings, "CAMERA_BATCH_ENABLED", True):
+                        detections, timings = await get_batcher().submit(frame)
+                    else:
+                        detections, timings = await get_executor().run(detect_objects, frame)
+                except InferenceQueueFull:
+                    self.mailbox.shed += 1
+                    gate.invalidate()
+                    return
+                # Report boxes in the coordinates of the frame the streamer sent
+                detections = scale_detections(detections, scale)
+                if self.tracker:
+                    detections = self.tracker.update(detections)
+                self.frames_since_detection = 0
+                gate.record(detections)
             
             # Send detections back to streamer
             if detections:
-                await self.send(text_data=json.dumps({
+                await self.send(text_data=dumps({
                     "action": "detections",
-                    "detections": detections
+                    "detections": detections,
+                    "frame": meta,
+                    "gated": gated,
+                    "timings": timings,
+                    "gate": gate.stats(),
+                    "frames": self.mailbox.stats()
+                }))
+            elif self.mailbox.has_new_drops():
+                # Still tell the streamer it is sending faster than we infer
+                await self.send(text_data=dumps({
+                    "action": "frame_stats",
+                    "frames": self.mailbox.stats()
                 }))
-                
-                # Broadcast detections to all viewers in this camera group
-                await self.channel_layer.group_send(
-                    f"camera_{self.camera_id}",
-                    {
-                        "type": "broadcast_detections",
-                        "detections": detections,
-                        "camera_id": self.camera_id,
-                        "camera_name": camera_name,
-                        "timestamp": datetime.now().strftime("%H:%M:%S")
-                    }
-                )
-                
-        except Exception as e:
-            print(f"Error processing frame: {e}")
-            import traceback
-            traceback.print_exc()
-
-    def detect_objects(self, frame):
-        """Run both models and collect all detections"""
-        detections = []
-
-        # ----- FACE MASK DETECTION -----
-        try:
-            mask_results = face_mask_model(frame, verbose=False)[0]
-            for box in mask_results.boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                conf = float(box.conf[0])
-                cls = int(box.cls[0])
-                class_name = face_mask_model.names[cls]
-
-                # Apply threshold
-                if conf >= CONFIDENCE_THRESHOLDS["face_mask"]:
-                    detections.append({
-                        "type": "face_mask",
-                        "class": class_name,
-                        "confidence": round(conf, 3),
-                        "bbox": [x1, y1, x2, y2],
-                        "severity": self.get_severity("face_mask", class_name)
-                    })
-        except Exception as e:
-            print(f"Error in face mask detection: {e}")
-
-        # ----- WEAPON & BLOOD DETECTION -----
-        try:
-            # Run detection with lower base confidence to catch more objects
-            weapon_results = weapon_model(frame, conf=0.4, verbose=False)[0]
-            
-            for box in weapon_results.boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                conf = float(box.conf[0])
-                cls = int(box.cls[0])
-                class_name = weapon_model.names[cls]
 
-                # Determine detection type
-                detection_type = self.classify_detection(class_name)
-                
-                # Apply class-specific threshold
-                threshold = CONFIDENCE_THRESHOLDS.get(detection_type, 0.5)
-                
-                # Debug logging
-                print(f"Detected: {class_name} ({detection_type}) - Confidence: {conf:.3f} - Threshold: {threshold}")
+            await self.broadcast(detections, camera_name)
                 
-                # Only include if meets threshold
-                if conf >= threshold:
-                    detections.append({
-                        "type": detection_type,
-                        "class": class_name,
-                        "confidence": round(conf, 3),
-                        "bbox": [x1, y1, x2, y2],
-                        "severity": self.get_severity(detection_type, class_name)
-                    })
-                else:
-                    print(f"  ❌ Filtered out (below threshold)")
-                    
         except Exception as e:
-            print(f"Error in weapon/blood detection: {e}")
+            print(f"Error processing frame: {e}")
             import traceback
             traceback.print_exc()
 
-        return detections
-
-    def classify_detection(self, class_name):
-        """Classify detection type based on class name"""
-        class_name_lower = class_name.lower()
-        
-        # More comprehensive matching
-        if any(keyword in class_name_lower for keyword in ['gun', 'pistol', 'firearm', 'rifle', 'weapon']):
-            return "gun"
-        elif any(keyword in class_name_lower for keyword in ['knife', 'blade', 'dagger', 'machete']):
-            return "knife"
-        elif 'blood' in class_name_lower:
-            return "blood"
+    async def broadcast(self, detections, camera_name):
+        """Broadcast detections to all viewers in this camera group.
+        The message is serialized once here and relayed as-is by every viewer."""
+        if getattr(settings, "CAMERA_BROADCAST_MODE", "full") == "delta" and self.encoder:
+            # Only added / changed / removed detections, with periodic keyframes
+            message = self.encoder.encode(detections)
+            if message is None:
+                return
+        elif detections:
+            message = {"action": "detections", "detections": detections}
         else:
-            # If no match, print for debugging
-            print(f"⚠️ Unknown class name: {class_name}")
-            return "weapon"
+            return
 
-    def get_severity(self, detection_type, class_name):
-        """Assign severity level to detections"""
-        # Critical severity for weapons and blood
-        if detection_type == "gun":
-            return "critical"
-        elif detection_type == "knife":
-            return "high"
-        elif detection_type == "blood":
-            return "high"
-        # Medium severity for no mask
-        elif detection_type == "face_mask" and any(word in class_name.lower() for word in ["without", "no", "not"]):
-            return "medium"
-        # Low severity for with mask
-        elif detection_type == "face_mask" and any(word in class_name.lower() for word in ["with", "mask"]):
-            return "low"
-        else:
-            return "medium"
+        message.update({
+            "camera_id": self.camera_id,
+            "camera_name": camera_name,
+            "timestamp": datetime.now().strftime("%H:%M:%S")
+        })
+        await get_hub().send(
+            self.channel_layer,
+            viewers_group(self.camera_id),
+            {
+                "type": "broadcast_detections",
+                "text": dumps(message)
+            },
+            skip_if_no_remote=True
+        )
 
-    # Handler for viewer joined notification
+    # Handler for viewer joined notification (streamers subgroup only)
     async def viewer_joined(self, event):
-        # Only send to streamer
-        if self.role == "streamer":
-            await self.send(text_data=json.dumps({
-                "action": "viewer_joined",
-                "viewer": event["viewer_channel"],
-                "camera_id": event["camera_id"]
-            }))
+        # Let the new viewer catch up from a full detection list
+        if self.encoder:
+            self.encoder.request_keyframe()
+        await self.send(text_data=json.dumps({
+            "action": "viewer_joined",
+            "viewer": event["viewer_channel"],
+            "camera_id": event["camera_id"]
+        }))
 
-    # Handler for streamer left notification
+    # Handler for streamer left notification (viewers subgroup only)
     async def streamer_left(self, event):
-        if self.role == "viewer":
-            await self.send(text_data=json.dumps({
-                "action": "streamer_left",
-                "camera_id": event["camera_id"]
-            }))
+        await self.send(text_data=json.dumps({
+            "action": "streamer_left",
+            "camera_id": event["camera_id"]
+        }))
 
     # Handler for WebRTC messages
     async def webrtc_message(self, event):
         await self.send(text_data=json.dumps(event["message"]))
 
-    # Handler for broadcasting detections to viewers
+    # Handler for broadcasting detections (viewers subgroup only)
     async def broadcast_detections(self, event):
-        # Only send to viewers
-        if self.role == "viewer":
-            await self.send(text_data=json.dumps({
-                "action": "detections",
-                "detections": event["detections"],
-                "camera_id": event["camera_id"],
-                "camera_name": event["camera_name"],
-                "timestamp": event["timestamp"]
-            }))
\ No newline at end of file
+        # The streamer already serialized the message
+        await self.send(text_data=event["text"])
+
+    # Handler for asynchronous detection job results (detection/services/jobs.py)
+    async def detection_result(self, event):
+        await self.send(text_data=event["text"])
@@ -0,0 +1,90 @@
+import cv2
+import numpy as np
+
+
+# libjpeg can scale by 1/2, 1/4 and 1/8 while decoding, skipping most of the IDCT work
+REDUCED_COLOR_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# Start-of-frame markers carry the image size (DHT, JPG and DAC share the range)
+SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(data):
+    """Return ``(width, height)`` from a JPEG's SOF segment, or None if not a JPEG."""
+    data = memoryview(data)
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            i += 1
+            continue
+        if marker in SOF_MARKERS:
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return width, height
+        i += 2 + ((data[i + 2] << 8) | data[i + 3])
+    return None
+
+
+class FrameDecoder:
+    """
+    Per-camera JPEG decoder that decodes at the smallest libjpeg scale that
+    still leaves the longest side at or above ``target_size`` (the model
+    input), so a 4K frame bound for a 640px model is decoded at 1/4 scale.
+
+    ``decode`` returns the frame and the factor that maps its coordinates
+    back onto the original image.
+    """
+
+    def __init__(self, target_size=640, reduced=True):
+        self.target_size = target_size
+        self.reduced = reduced
+        self._size = None
+        self._flags = cv2.IMREAD_COLOR
+        self._factor = 1
+
+    def _choose(self, size):
+        self._size = size
+        self._flags, self._factor = cv2.IMREAD_COLOR, 1
+        if not self.reduced or size is None:
+            return
+        longest = max(size)
+        for factor, flags in REDUCED_COLOR_FLAGS:
+            if longest / factor >= self.target_size:
+                self._flags, self._factor = flags, factor
+                return
+
+    def decode(self, data):
+        size = jpeg_size(data)
+        if size != self._size:
+            # Streams rarely change resolution; only re-pick on a change
+            self._choose(size)
+
+        frame = cv2.imdecode(np.frombuffer(data, np.uint8), self._flags)
+        if frame is None:
+            return None, 1.0
+        if size is None:
+            return frame, 1.0
+        # libjpeg rounds reduced sizes up, so derive the exact factor. imdecode
+        # applies EXIF rotation but the SOF size is pre-rotation; the longest
+        # side is the same either way
+        return frame, max(size) / max(frame.shape[:2])
+
+
+def scale_detections(detections, scale):
+    """Map detection boxes from decoded-frame coordinates back to the original frame."""
+    if scale == 1.0:
+        return detections
+    for detection in detections:
+        detection["bbox"] = [int(round(v * scale)) for v in detection["bbox"]]
+    return detections
@@ -0,0 +1,126 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference executor already has max_pending jobs."""
+
+
+def _init_worker(torch_threads):
+    """Pin torch's intra-op thread count so workers do not oversubscribe the CPU."""
+    import torch
+
+    torch.set_num_threads(torch_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only settable before the first parallel op in this process
+        pass
+
+
+class InferenceExecutor:
+    """
+    Bounded executor dedicated to YOLO inference.
+
+    ``mode`` is ``"thread"`` (models shared in this process) or ``"process"``
+    (each worker process loads its own copy of the models). At most
+    ``max_pending`` jobs may be queued or running; past that, ``run`` raises
+    ``InferenceQueueFull`` so callers can shed the frame instead of queueing it.
+
+    In thread mode every worker shares one instance of each model behind
+    ``MODEL_LOCKS``, so more than ``THREAD_WORKERS`` workers would only queue
+    on the locks: the pool is capped there (one batch in predict, one in
+    pre/post-processing) and torch's process-wide intra-op pool is split
+    between the models that can predict at once instead of between workers.
+    Process mode scales with ``workers``, each with its own models.
+    """
+
+    THREAD_WORKERS = 2
+
+    def __init__(self, mode="thread", workers=None, torch_threads=None, max_pending=None):
+        cores = os.cpu_count() or 1
+        self.mode = mode
+        if mode == "thread":
+            from cameras.inference import MODEL_CONCURRENCY
+
+            if workers and workers > self.THREAD_WORKERS:
+                print(f"⚠️ {workers} thread inference workers would queue on the model locks; using {self.THREAD_WORKERS}")
+            self.workers = min(workers or self.THREAD_WORKERS, self.THREAD_WORKERS)
+            self.torch_threads = torch_threads or max(1, cores // MODEL_CONCURRENCY)
+        else:
+            self.workers = workers or max(1, cores // 2)
+            self.torch_threads = torch_threads or max(1, cores // self.workers)
+        self.max_pending = max_pending or self.workers * 2
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+        if mode == "process":
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.torch_threads,),
+            )
+        elif mode == "thread":
+            # torch's intra-op pool is process-wide, so set it once here
+            _init_worker(self.torch_threads)
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        else:
+            raise ValueError(f"Unknown inference executor mode: {mode}")
+
+        print(f"✅ Inference executor: {mode} x{self.workers}, torch threads {self.torch_threads}, max pending {self.max_pending}")
+
+    async def run(self, fn, *args):
+        """Run ``fn(*args)`` on the executor, or raise InferenceQueueFull."""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise InferenceQueueFull(f"{self.pending} inference jobs already pending")
+            self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide inference executor configured from settings."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = InferenceExecutor(
+                mode=getattr(settings, "CAMERA_INFERENCE_MODE", "thread"),
+                workers=getattr(settings, "CAMERA_INFERENCE_WORKERS", None),
+                torch_threads=getattr(settings, "CAMERA_INFERENCE_TORCH_THREADS", None),
+                max_pending=getattr(settings, "CAMERA_INFERENCE_MAX_PENDING", None),
+            )
+    return _executor
+
+
+def executor_stats():
+    """Counters of the process-wide executor, or None until the first frame creates it."""
+    executor = _executor
+    return executor.stats() if executor is not None else None
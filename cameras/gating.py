@@ -0,0 +1,106 @@
+import threading
+import time
+
+import cv2
+from django.conf import settings
+
+
+class MotionGate:
+    """
+    Decides whether a camera frame is worth running the YOLO models on.
+
+    Each frame is reduced to a tiny grayscale thumbnail and compared with the
+    thumbnail of the last frame that was actually inferred. Inference is
+    skipped while the mean absolute difference stays below ``threshold``,
+    except that a refresh is forced every ``refresh_seconds``. A frame that
+    passes only becomes the new reference once ``record`` is called for it,
+    i.e. once inference has actually run on it.
+    """
+
+    def __init__(self, threshold=4.0, refresh_seconds=5.0, size=(64, 36)):
+        self.threshold = threshold
+        self.refresh_seconds = refresh_seconds
+        self.size = size
+        self.reference = None
+        self.last_inference_at = 0.0
+        self.last_detections = []
+        self._pending = None  # (thumbnail, time) of the last frame that passed
+        self.frames = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def _thumbnail(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA)
+
+    def should_infer(self, frame):
+        """Return True if ``frame`` differs enough from the last inferred frame."""
+        thumb = self._thumbnail(frame)
+        now = time.monotonic()
+        with self._lock:
+            self.frames += 1
+            if (
+                self.reference is not None
+                and now - self.last_inference_at < self.refresh_seconds
+                and float(cv2.absdiff(thumb, self.reference).mean()) < self.threshold
+            ):
+                self.skipped += 1
+                return False
+
+            self._pending = (thumb, now)
+            return True
+
+    def invalidate(self):
+        """Force the next frame through, e.g. after an inference was shed."""
+        with self._lock:
+            self.reference = None
+            self._pending = None
+
+    def record(self, detections):
+        """
+        Remember the detections of the last inferred frame for re-emission
+        and make that frame the reference the next ones are compared with.
+        """
+        with self._lock:
+            if self._pending is not None:
+                self.reference, self.last_inference_at = self._pending
+                self._pending = None
+            self.last_detections = detections
+
+    def stats(self):
+        with self._lock:
+            return {
+                "frames": self.frames,
+                "skipped": self.skipped,
+                "skip_ratio": round(self.skipped / self.frames, 3) if self.frames else 0.0,
+            }
+
+
+# camera_id -> MotionGate
+GATES = {}
+_gates_lock = threading.Lock()
+
+
+def get_gate(camera_id):
+    with _gates_lock:
+        gate = GATES.get(camera_id)
+        if gate is None:
+            gate = MotionGate(
+                threshold=getattr(settings, "CAMERA_GATE_THRESHOLD", 4.0),
+                refresh_seconds=getattr(settings, "CAMERA_GATE_REFRESH_SECONDS", 5.0),
+                size=getattr(settings, "CAMERA_GATE_SIZE", (64, 36)),
+            )
+            GATES[camera_id] = gate
+        return gate
+
+
+def drop_gate(camera_id):
+    with _gates_lock:
+        GATES.pop(camera_id, None)
+
+
+def gate_stats():
+    """Skip counters for every camera that currently has a gate."""
+    with _gates_lock:
+        gates = dict(GATES)
+    return {camera_id: gate.stats() for camera_id, gate in gates.items()}
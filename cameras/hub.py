@@ -0,0 +1,230 @@
+import asyncio
+import math
+import time
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+
+
+def viewers_group(camera_id):
+    return f"camera_{camera_id}_viewers"
+
+
+def streamers_group(camera_id):
+    return f"camera_{camera_id}_streamers"
+
+
+class FanoutHub:
+    """
+    Per-process fan-out for the camera groups.
+
+    Consumers in this process are delivered to directly, by calling their
+    handler for the message ``type``, without a trip through Redis. The
+    process itself joins each channel-layer group once, on a single hub
+    channel, so a message from another process crosses Redis once per
+    process rather than once per consumer and is then fanned out locally.
+
+    How many members each process has in a group is kept in a Redis hash
+    (``hawkshield:hub:<group>``); detection broadcasts are only published to
+    the channel layer when another process has members. That view is cached
+    for ``membership_ttl`` seconds, and when Redis cannot be asked the
+    message is always published. Each entry is stamped with the time it was
+    written and rewritten every ``refresh_interval`` seconds, along with
+    the hub channel's group membership (which the channel layer expires
+    after ``group_expiry``); entries older than ``membership_expiry``, left
+    by a process that died, are ignored and removed. Published messages are tagged with this
+    process's id so the hub channel skips its own echo. Anything published to these groups from
+    outside the hub (e.g. by the detection job workers) must carry the
+    ``group`` name so the receiving hub knows whom to deliver to.
+
+    With ``enabled=False`` every consumer joins the channel-layer groups on
+    its own channel and every message goes through ``group_send``.
+    """
+
+    KEY_PREFIX = "hawkshield:hub:"
+
+    def __init__(self, enabled=True, membership_ttl=2.0, refresh_interval=30.0, membership_expiry=90.0):
+        self.enabled = enabled
+        self.membership_ttl = membership_ttl
+        self.refresh_interval = refresh_interval
+        self.membership_expiry = membership_expiry
+        self.process_id = uuid.uuid4().hex
+        self.channel = None
+        self._groups = defaultdict(set)  # group -> consumers in this process
+        self._remote = {}  # group -> (checked at, another process has members)
+        self._listener = None
+        self._refresher = None
+        self._channel_lock = asyncio.Lock()
+        self.local_deliveries = 0
+        self.remote_sends = 0
+        self.remote_skipped = 0
+
+    def _key(self, group):
+        return f"{self.KEY_PREFIX}{group}"
+
+    async def join(self, group, consumer):
+        if not self.enabled:
+            await consumer.channel_layer.group_add(group, consumer.channel_name)
+            return
+        members = self._groups[group]
+        if consumer in members:
+            return
+        members.add(consumer)
+        async with self._channel_lock:
+            if self.channel is None:
+                self.channel = await consumer.channel_layer.new_channel("hub.")
+                self._listener = asyncio.create_task(self._listen(consumer.channel_layer))
+                self._refresher = asyncio.create_task(self._refresh(consumer.channel_layer))
+        # Re-added on every join, which also renews the layer's group expiry
+        await consumer.channel_layer.group_add(group, self.channel)
+        await self._publish_count(group)
+
+    async def leave(self, group, consumer):
+        if not self.enabled:
+            await consumer.channel_layer.group_discard(group, consumer.channel_name)
+            return
+        members = self._groups.get(group)
+        if not members or consumer not in members:
+            return
+        members.discard(consumer)
+        if not members:
+            del self._groups[group]
+            await consumer.channel_layer.group_discard(group, self.channel)
+        await self._publish_count(group)
+
+    async def send(self, channel_layer, group, message, skip_if_no_remote=False):
+        """
+        Deliver ``message`` to every member of ``group``, local ones directly.
+
+        Only with ``skip_if_no_remote`` (high-rate detection broadcasts) may
+        the channel-layer publish be skipped on the cached membership view;
+        control and signalling messages are always published, since a member
+        that joined on another process within the cache window must not miss
+        them.
+        """
+        if not self.enabled:
+            await channel_layer.group_send(group, message)
+            return
+        await self._deliver(group, message)
+        if not skip_if_no_remote or await self._has_remote(group):
+            self.remote_sends += 1
+            await channel_layer.group_send(group, {**message, "group": group, "origin": self.process_id})
+        else:
+            self.remote_skipped += 1
+
+    async def _deliver(self, group, message):
+        members = list(self._groups.get(group, ()))
+        if not members:
+            return
+        handler = message["type"].replace(".", "_")
+        results = await asyncio.gather(
+            *(getattr(consumer, handler)(message) for consumer in members),
+            return_exceptions=True
+        )
+        self.local_deliveries += len(members)
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Error delivering {message['type']} to {group}: {result}")
+
+    async def _listen(self, channel_layer):
+        """Fan out messages published by other processes (or by the job workers)."""
+        while True:
+            try:
+                message = await channel_layer.receive(self.channel)
+                if message.get("origin") == self.process_id:
+                    continue
+                # Publishers name the group in the message; the hub channel is in several
+                if message.get("group") is not None:
+                    await self._deliver(message["group"], message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in fan-out hub listener: {e}")
+
+    async def _refresh(self, channel_layer):
+        """Keep this process's group memberships and counts from expiring."""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            for group in list(self._groups):
+                if group not in self._groups:
+                    continue  # emptied while an earlier group was refreshed
+                try:
+                    await channel_layer.group_add(group, self.channel)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Error refreshing hub membership for {group}: {e}")
+                await self._publish_count(group)
+
+    async def _publish_count(self, group):
+        count = len(self._groups.get(group, ()))
+        try:
+            await asyncio.to_thread(self._write_count, group, count)
+        except Exception as e:
+            print(f"Error publishing hub membership for {group}: {e}")
+
+    def _write_count(self, group, count):
+        from backend.redis_client import get_redis_client
+
+        client = get_redis_client()
+        if count:
+            client.hset(self._key(group), self.process_id, f"{count}:{time.time()}")
+            # Drops the whole hash once no process is refreshing it
+            client.expire(self._key(group), math.ceil(self.membership_expiry))
+        else:
+            client.hdel(self._key(group), self.process_id)
+
+    def _read_remote(self, group):
+        from backend.redis_client import get_redis_client
+
+        client = get_redis_client()
+        has_remote = False
+        stale = []
+        for process_id, value in client.hgetall(self._key(group)).items():
+            count, _, written_at = value.decode().partition(":")
+            if not written_at or time.time() - float(written_at) > self.membership_expiry:
+                stale.append(process_id)
+            elif process_id.decode() != self.process_id and int(count) > 0:
+                has_remote = True
+        if stale:
+            client.hdel(self._key(group), *stale)
+        return has_remote
+
+    async def _has_remote(self, group):
+        now = time.monotonic()
+        cached = self._remote.get(group)
+        if cached is not None and now - cached[0] < self.membership_ttl:
+            return cached[1]
+        try:
+            has_remote = await asyncio.to_thread(self._read_remote, group)
+        except Exception as e:
+            print(f"Hub membership unknown for {group}, publishing: {e}")
+            has_remote = True
+        self._remote[group] = (now, has_remote)
+        return has_remote
+
+    def stats(self):
+        return {
+            "process_id": self.process_id,
+            "groups": {group: len(members) for group, members in self._groups.items()},
+            "local_deliveries": self.local_deliveries,
+            "remote_sends": self.remote_sends,
+            "remote_skipped": self.remote_skipped,
+        }
+
+
+_hub = None
+
+
+def get_hub():
+    """Process-wide fan-out hub."""
+    global _hub
+    if _hub is None:
+        _hub = FanoutHub(
+            enabled=getattr(settings, "CAMERA_LOCAL_FANOUT", True),
+            membership_ttl=getattr(settings, "CAMERA_FANOUT_MEMBERSHIP_TTL", 2.0),
+            refresh_interval=getattr(settings, "CAMERA_FANOUT_REFRESH_INTERVAL", 30.0),
+            membership_expiry=getattr(settings, "CAMERA_FANOUT_MEMBERSHIP_EXPIRY", 90.0),
+        )
+    return _hub
@@ -0,0 +1,250 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+from cameras.registry import get_registry
+
+
+# Set different confidence thresholds per detection type
+CONFIDENCE_THRESHOLDS = {
+    "face_mask": 0.5,
+    "gun": 0.6,      # Higher threshold to reduce false positives
+    "knife": 0.55,   # Slightly higher
+    "blood": 0.7,    # Much higher to prevent false blood detections
+}
+
+# Square model input both models are fed; must be a multiple of 32
+INPUT_SIZE = getattr(settings, "CAMERA_INPUT_SIZE", 640)
+LETTERBOX_FILL = 114
+
+# A YOLO predictor is not safe to call from two threads at once
+MODEL_LOCKS = {
+    "face_mask": threading.Lock(),
+    "weapon": threading.Lock(),
+}
+
+# Run the two models side by side when there are cores to spare
+PARALLEL_MODELS = (os.cpu_count() or 1) >= 4
+_model_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="yolo-model") if PARALLEL_MODELS else None
+
+# How many predict calls can run at once in this process, given the locks above;
+# the thread-mode inference executor is sized from this (see cameras/executor.py)
+MODEL_CONCURRENCY = len(MODEL_LOCKS) if PARALLEL_MODELS else 1
+
+
+# Per-thread scratch buffers reused across frames instead of reallocating
+_buffers = threading.local()
+
+
+def _buffer(name, shape, dtype):
+    """A thread-local array of at least ``shape``, grown only when a batch is bigger"""
+    buf = getattr(_buffers, name, None)
+    if buf is None or buf.shape[0] < shape[0] or buf.shape[1:] != shape[1:] or buf.dtype != dtype:
+        buf = np.empty(shape, dtype=dtype)
+        setattr(_buffers, name, buf)
+    return buf[:shape[0]]
+
+
+def letterbox(frame, size=INPUT_SIZE, out=None):
+    """
+    Resize ``frame`` to fit a ``size`` x ``size`` square keeping its aspect
+    ratio and pad the rest, into ``out`` if given.
+    Returns the padded image and ``(scale, pad_x, pad_y)``.
+    """
+    h, w = frame.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = round(w * scale), round(h * scale)
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    canvas = out if out is not None else np.empty((size, size, 3), dtype=np.uint8)
+    canvas.fill(LETTERBOX_FILL)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = frame
+    return canvas, (scale, pad_x, pad_y)
+
+
+def preprocess(frames):
+    """
+    Letterbox, normalize and convert a batch of BGR frames once into the
+    RGB BCHW float32 array both models consume.
+    Returns the array and one transform per frame for ``unletterbox``.
+    The array is a reused per-thread buffer: it is overwritten by the next
+    call on the same thread.
+    """
+    canvas = _buffer("canvas", (1, INPUT_SIZE, INPUT_SIZE, 3), np.uint8)[0]
+    batch = _buffer("batch", (len(frames), 3, INPUT_SIZE, INPUT_SIZE), np.float32)
+    transforms = []
+    for i, frame in enumerate(frames):
+        _, transform = letterbox(frame, out=canvas)
+        # BGR HWC uint8 -> RGB CHW float in [0, 1], written straight into the batch
+        np.multiply(canvas[..., ::-1].transpose(2, 0, 1), 1 / 255.0, out=batch[i], casting="unsafe")
+        transforms.append(transform)
+    return batch, transforms
+
+
+def unletterbox(xyxy, transform, frame_shape):
+    """Map a box from model input coordinates back onto the original frame"""
+    scale, pad_x, pad_y = transform
+    h, w = frame_shape[:2]
+    x1, y1, x2, y2 = (float(v) for v in xyxy)
+    return [
+        int(min(max((x1 - pad_x) / scale, 0), w)),
+        int(min(max((y1 - pad_y) / scale, 0), h)),
+        int(min(max((x2 - pad_x) / scale, 0), w)),
+        int(min(max((y2 - pad_y) / scale, 0), h)),
+    ]
+
+
+def mask_detections(boxes, names, transform, frame_shape):
+    """Convert one frame's face mask boxes into detection dicts"""
+    detections = []
+    for box in boxes:
+        x1, y1, x2, y2 = unletterbox(box[:4], transform, frame_shape)
+        conf = float(box[4])
+        cls = int(box[5])
+        class_name = names[cls]
+
+        # Apply threshold
+        if conf >= CONFIDENCE_THRESHOLDS["face_mask"]:
+            detections.append({
+                "type": "face_mask",
+                "class": class_name,
+                "confidence": round(conf, 3),
+                "bbox": [x1, y1, x2, y2],
+                "severity": get_severity("face_mask", class_name)
+            })
+    return detections
+
+
+def weapon_detections(boxes, names, transform, frame_shape):
+    """Convert one frame's weapon boxes into detection dicts"""
+    detections = []
+    for box in boxes:
+        x1, y1, x2, y2 = unletterbox(box[:4], transform, frame_shape)
+        conf = float(box[4])
+        cls = int(box[5])
+        class_name = names[cls]
+
+        # Determine detection type
+        detection_type = classify_detection(class_name)
+
+        # Apply class-specific threshold
+        threshold = CONFIDENCE_THRESHOLDS.get(detection_type, 0.5)
+
+        # Debug logging
+        print(f"Detected: {class_name} ({detection_type}) - Confidence: {conf:.3f} - Threshold: {threshold}")
+
+        # Only include if meets threshold
+        if conf >= threshold:
+            detections.append({
+                "type": detection_type,
+                "class": class_name,
+                "confidence": round(conf, 3),
+                "bbox": [x1, y1, x2, y2],
+                "severity": get_severity(detection_type, class_name)
+            })
+        else:
+            print(f"  ❌ Filtered out (below threshold)")
+    return detections
+
+
+def run_model(name, batch, conf):
+    """Run one model over the shared input batch; returns (boxes per frame, class names, elapsed ms)"""
+    model = get_registry().get(name)
+    started = time.perf_counter()
+    with MODEL_LOCKS[name]:
+        results = model.predict(batch, conf=conf)
+    return results, model.names, round((time.perf_counter() - started) * 1000, 1)
+
+
+def detect_batch(frames):
+    """
+    Run each model once over a batch of frames.
+    Returns one ``(detections, timings)`` pair per frame; the timings are
+    those of the whole batch.
+    """
+    detections = [[] for _ in frames]
+    timings = {}
+
+    started = time.perf_counter()
+    batch, transforms = preprocess(frames)
+    timings["preprocess_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    # Run detection with lower base confidence on the weapon model to catch more objects
+    if _model_pool is not None:
+        mask_future = _model_pool.submit(run_model, "face_mask", batch, 0.25)
+        weapon_future = _model_pool.submit(run_model, "weapon", batch, 0.4)
+    else:
+        mask_future = weapon_future = None
+
+    # ----- FACE MASK DETECTION -----
+    try:
+        if mask_future is not None:
+            mask_results, names, timings["face_mask_ms"] = mask_future.result()
+        else:
+            mask_results, names, timings["face_mask_ms"] = run_model("face_mask", batch, 0.25)
+        for frame, transform, frame_detections, boxes in zip(frames, transforms, detections, mask_results):
+            frame_detections.extend(mask_detections(boxes, names, transform, frame.shape))
+    except Exception as e:
+        print(f"Error in face mask detection: {e}")
+
+    # ----- WEAPON & BLOOD DETECTION -----
+    try:
+        if weapon_future is not None:
+            weapon_results, names, timings["weapon_ms"] = weapon_future.result()
+        else:
+            weapon_results, names, timings["weapon_ms"] = run_model("weapon", batch, 0.4)
+        for frame, transform, frame_detections, boxes in zip(frames, transforms, detections, weapon_results):
+            frame_detections.extend(weapon_detections(boxes, names, transform, frame.shape))
+    except Exception as e:
+        print(f"Error in weapon/blood detection: {e}")
+        import traceback
+        traceback.print_exc()
+
+    timings["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return [(frame_detections, timings) for frame_detections in detections]
+
+
+def detect_objects(frame):
+    """Run both models on a single frame; returns (detections, timings)"""
+    return detect_batch([frame])[0]
+
+
+def classify_detection(class_name):
+    """Classify detection type based on class name"""
+    class_name_lower = class_name.lower()
+
+    # More comprehensive matching
+    if any(keyword in class_name_lower for keyword in ['gun', 'pistol', 'firearm', 'rifle', 'weapon']):
+        return "gun"
+    elif any(keyword in class_name_lower for keyword in ['knife', 'blade', 'dagger', 'machete']):
+        return "knife"
+    elif 'blood' in class_name_lower:
+        return "blood"
+    else:
+        # If no match, print for debugging
+        print(f"⚠️ Unknown class name: {class_name}")
+        return "weapon"
+
+def get_severity(detection_type, class_name):
+    """Assign severity level to detections"""
+    # Critical severity for weapons and blood
+    if detection_type == "gun":
+        return "critical"
+    elif detection_type == "knife":
+        return "high"
+    elif detection_type == "blood":
+        return "high"
+    # Medium severity for no mask
+    elif detection_type == "face_mask" and any(word in class_name.lower() for word in ["without", "no", "not"]):
+        return "medium"
+    # Low severity for with mask
+    elif detection_type == "face_mask" and any(word in class_name.lower() for word in ["with", "mask"]):
+        return "low"
+    else:
+        return "medium"
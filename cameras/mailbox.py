@@ -0,0 +1,50 @@
+import asyncio
+
+
+class FrameMailbox:
+    """
+    Single-slot, latest-frame-wins mailbox between a streamer's websocket
+    receive path and its detection worker.
+
+    ``put`` never blocks: a frame still waiting to be processed is replaced
+    (and counted as dropped), so the worker always picks up the newest frame
+    and detection latency stays bounded by one inference.
+    """
+
+    def __init__(self):
+        self._item = None
+        self._ready = asyncio.Event()
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.shed = 0  # taken from the mailbox but refused by the inference executor
+        self._reported_dropped = 0
+
+    def put(self, item):
+        self.received += 1
+        if self._item is not None:
+            self.dropped += 1
+        self._item = item
+        self._ready.set()
+
+    async def get(self):
+        await self._ready.wait()
+        self._ready.clear()
+        item, self._item = self._item, None
+        self.processed += 1
+        return item
+
+    def has_new_drops(self):
+        """True once per batch of drops that has not been reported yet."""
+        if self.dropped == self._reported_dropped:
+            return False
+        self._reported_dropped = self.dropped
+        return True
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "shed": self.shed,
+        }
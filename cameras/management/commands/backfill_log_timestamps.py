@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from detection.services.log_store import backfill_log_timestamps, ensure_log_indexes
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert legacy ISO string timestamps in the detection logs to BSON dates, "
+        "so the date filters and cursors of /api/detection/logs/ match them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Log entries updated per bulk write")
+
+    def handle(self, *args, **options):
+        collection = getattr(settings, "LOGS_COLLECTION", None)
+        if collection is None:
+            raise CommandError("settings.LOGS_COLLECTION is not configured")
+
+        ensure_log_indexes(collection)
+        converted = backfill_log_timestamps(collection, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Converted {converted} log timestamps"))
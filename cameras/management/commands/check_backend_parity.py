@@ -0,0 +1,41 @@
+import json
+
+import cv2
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from cameras.backends import check_parity, create_backend
+from cameras.inference import preprocess
+from cameras.registry import get_registry
+
+
+class Command(BaseCommand):
+    help = "Compare an inference backend's detections against the torch backend on sample images"
+
+    def add_arguments(self, parser):
+        parser.add_argument("images", nargs="+", help="Sample frames to run both backends on")
+        parser.add_argument("--backend", default="onnx", help="Backend to check: onnx or onnx-int8")
+        parser.add_argument("--model", action="append", help="Model name(s); defaults to all")
+        parser.add_argument("--conf", type=float, default=0.25)
+        parser.add_argument("--iou", type=float, default=0.5, help="IoU needed to count a box as matched")
+
+    def handle(self, *args, **options):
+        frames = []
+        for path in options["images"]:
+            frame = cv2.imread(path)
+            if frame is None:
+                raise CommandError(f"Could not read image: {path}")
+            frames.append(frame)
+        # preprocess() reuses its output buffer, so keep a copy per batch
+        batches = [preprocess([frame])[0].copy() for frame in frames]
+
+        registry = get_registry()
+        input_size = getattr(settings, "CAMERA_INPUT_SIZE", 640)
+        report = {}
+        for name in options["model"] or registry.specs:
+            weights = registry.resolve(registry.specs[name]["weights"])
+            reference = create_backend(weights, "torch", input_size)
+            candidate = create_backend(weights, options["backend"], input_size)
+            report[name] = check_parity(reference, candidate, batches, conf=options["conf"], iou_threshold=options["iou"])
+
+        self.stdout.write(json.dumps(report, indent=2))
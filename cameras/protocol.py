@@ -0,0 +1,60 @@
+"""
+Binary websocket frame protocol for streamers.
+
+A binary message is a fixed header, the UTF-8 camera id and the raw JPEG:
+
+    version      u8   (1)
+    flags        u8   (reserved, 0)
+    id_length    u16  length of the camera id in bytes
+    sequence     u32  streamer-assigned frame counter
+    captured_at  f64  capture time, seconds since the epoch
+    camera_id    id_length bytes
+    jpeg         rest of the message
+
+All integers are big-endian. Older clients keep sending JSON ``video_frame``
+messages carrying a base64 data URL.
+"""
+import base64
+import struct
+from collections import namedtuple
+
+
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct("!BBHId")
+
+BinaryFrame = namedtuple("BinaryFrame", ["camera_id", "sequence", "captured_at", "jpeg"])
+
+
+class ProtocolError(ValueError):
+    """Raised for a binary message that does not follow the frame protocol."""
+
+
+def parse_frame(message):
+    """Split a binary websocket message into a ``BinaryFrame``."""
+    if len(message) < HEADER.size:
+        raise ProtocolError("Binary frame shorter than its header")
+
+    version, _flags, id_length, sequence, captured_at = HEADER.unpack_from(message)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported frame protocol version {version}")
+
+    start = HEADER.size + id_length
+    if len(message) <= start:
+        raise ProtocolError("Binary frame has no image payload")
+
+    try:
+        camera_id = bytes(message[HEADER.size:start]).decode("utf-8")
+    except UnicodeDecodeError:
+        raise ProtocolError("Binary frame camera id is not valid UTF-8")
+    return BinaryFrame(camera_id, sequence, captured_at, memoryview(message)[start:])
+
+
+def pack_frame(camera_id, sequence, captured_at, jpeg):
+    """Build a binary frame message (the inverse of ``parse_frame``)."""
+    camera_id = camera_id.encode("utf-8")
+    return HEADER.pack(PROTOCOL_VERSION, 0, len(camera_id), sequence, captured_at) + camera_id + bytes(jpeg)
+
+
+def decode_data_url(frame_data):
+    """Raw image bytes from a legacy ``data:image/jpeg;base64,...`` frame."""
+    return base64.b64decode(frame_data.split(",", 1)[-1])
@@ -0,0 +1,186 @@
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from django.conf import settings
+
+from cameras.backends import create_backend
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+WEIGHTS_DIR = BASE_DIR / "cameras" / "weights"
+
+DEFAULT_MODELS = {
+    "face_mask": {"weights": "face_mask_best.pt"},
+    "weapon": {"weights": "knife_detector.pt"},
+}
+
+# Don't retry a failed lazy load on every frame
+LOAD_RETRY_SECONDS = 30
+
+
+class ModelNotLoaded(Exception):
+    """Raised when a model failed to load and has no previous version to fall back on."""
+
+
+class ModelRegistry:
+    """
+    Loads the consumer's YOLO models (through the configured inference
+    backend, see ``cameras.backends``) on first use or in the background,
+    runs a warmup inference before a model is served, reports readiness and
+    swaps in new weights without a restart.
+
+    ``get`` always returns a fully warmed model: a hot-swap loads and warms
+    the new weights on the side and only then replaces the served instance,
+    so in-flight inferences finish on the old one.
+    """
+
+    def __init__(self, specs, warmup_runs=1, input_size=640, backend="torch", threads=0):
+        self.specs = {name: dict(spec) for name, spec in specs.items()}
+        self.warmup_runs = warmup_runs
+        self.input_size = input_size
+        self.backend = backend
+        self.threads = threads
+        self._models = {}
+        self._serving = {}  # name -> weights path currently served
+        self._status = {name: {"state": "pending"} for name in specs}
+        self._load_locks = {name: threading.RLock() for name in specs}
+        self._failed_at = {}  # name -> monotonic time of the last failed load
+        self._preload_thread = None
+        self._lock = threading.Lock()
+
+    def resolve(self, weights):
+        """Weights paths are relative to cameras/weights/ unless absolute."""
+        path = Path(weights)
+        return path if path.is_absolute() else WEIGHTS_DIR / path
+
+    def _warmup(self, model):
+        dummy = np.zeros((1, 3, self.input_size, self.input_size), dtype=np.float32)
+        started = time.perf_counter()
+        for _ in range(self.warmup_runs):
+            model.predict(dummy)
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    def _set_status(self, name, **status):
+        with self._lock:
+            self._status[name] = status
+
+    def load(self, name, weights=None):
+        """Load (or reload) ``name``, warm it up and start serving it."""
+        with self._load_locks[name]:
+            spec = self.specs[name]
+            weights = weights or spec["weights"]
+            path = self.resolve(weights)
+            backend = spec.get("backend", self.backend)
+            self._set_status(name, state="loading", weights=str(path), backend=backend, serving=self._serving.get(name))
+            try:
+                started = time.perf_counter()
+                model = create_backend(path, backend, self.input_size, self.threads)
+                load_ms = round((time.perf_counter() - started) * 1000, 1)
+                warmup_ms = self._warmup(model) if self.warmup_runs else 0.0
+            except Exception as e:
+                print(f"❌ Failed to load {name} model from {path}: {e}")
+                # A failed hot-swap keeps serving the previous weights
+                self._set_status(name, state="failed", weights=str(path), backend=backend, error=str(e), serving=self._serving.get(name))
+                self._failed_at[name] = time.monotonic()
+                raise
+
+            with self._lock:
+                self._models[name] = model
+                self._serving[name] = str(path)
+                spec["weights"] = weights
+                self._status[name] = {
+                    "state": "ready",
+                    "weights": str(path),
+                    "backend": backend,
+                    "classes": model.names,
+                    "load_ms": load_ms,
+                    "warmup_ms": warmup_ms,
+                    "loaded_at": time.time(),
+                }
+            print(f"✅ {name} model ready ({path.name} on {backend}, load {load_ms} ms, warmup {warmup_ms} ms)")
+            return model
+
+    def get(self, name):
+        """Return the served model, loading it now if nothing is loaded yet."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._load_locks[name]:
+            # Another thread may have finished loading while we waited
+            model = self._models.get(name)
+            if model is not None:
+                return model
+            failed_at = self._failed_at.get(name)
+            if failed_at is not None and time.monotonic() - failed_at < LOAD_RETRY_SECONDS:
+                raise ModelNotLoaded(f"{name} model failed to load: {self._status[name].get('error')}")
+            try:
+                return self.load(name)
+            except Exception as e:
+                raise ModelNotLoaded(f"{name} model is not available: {e}") from e
+
+    def preload(self):
+        """Load every model in a background thread; a no-op while one is already running."""
+        with self._lock:
+            if self._preload_thread is not None and self._preload_thread.is_alive():
+                return self._preload_thread
+
+        def run():
+            for name in self.specs:
+                if name not in self._models:
+                    try:
+                        self.load(name)
+                    except Exception:
+                        pass
+
+        with self._lock:
+            if self._preload_thread is not None and self._preload_thread.is_alive():
+                return self._preload_thread
+            thread = threading.Thread(target=run, name="model-preload", daemon=True)
+            self._preload_thread = thread
+        thread.start()
+        return thread
+
+    def reload(self, name, weights=None, background=True):
+        """Hot-swap ``name`` to new weights without interrupting inference."""
+        if not background:
+            return self.load(name, weights)
+        thread = threading.Thread(target=self.load, args=(name, weights), name=f"model-reload-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def ready(self, name=None):
+        """Whether ``name`` (or, without a name, every model) is loaded and warm."""
+        with self._lock:
+            if name is not None:
+                return name in self._models
+            return all(name in self._models for name in self.specs)
+
+    def status(self):
+        with self._lock:
+            return {
+                "ready": all(name in self._models for name in self.specs),
+                "models": {name: dict(status) for name, status in self._status.items()},
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide model registry configured from settings."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry(
+                getattr(settings, "CAMERA_MODELS", DEFAULT_MODELS),
+                warmup_runs=getattr(settings, "CAMERA_MODEL_WARMUP_RUNS", 1),
+                input_size=getattr(settings, "CAMERA_INPUT_SIZE", 640),
+                backend=getattr(settings, "CAMERA_INFERENCE_BACKEND", "torch"),
+                threads=getattr(settings, "CAMERA_INFERENCE_TORCH_THREADS", None) or 0,
+            )
+    return _registry
@@ -0,0 +1,105 @@
+from itertools import count
+
+import numpy as np
+
+from cameras.backends import box_iou
+
+
+class Track:
+    """
+    One tracked object. The box is smoothed with an alpha-beta filter, a
+    fixed-gain simplification of a constant-velocity Kalman filter, so it can
+    be propagated on frames where detection is not run.
+    """
+
+    def __init__(self, track_id, detection):
+        self.id = track_id
+        self.detection = dict(detection)
+        self.bbox = np.array(detection["bbox"], dtype=np.float32)
+        self.velocity = np.zeros(4, dtype=np.float32)  # per frame, for x1, y1, x2, y2
+        self.age = 0  # frames since the track was created
+        self.hits = 1
+        self.misses = 0  # consecutive detection passes without a match
+        self.steps_since_update = 0
+
+    def predict(self):
+        self.bbox = self.bbox + self.velocity
+        self.age += 1
+        self.steps_since_update += 1
+
+    def correct(self, detection, alpha, beta):
+        measured = np.array(detection["bbox"], dtype=np.float32)
+        steps = max(self.steps_since_update, 1)
+        residual = measured - self.bbox
+        self.bbox = self.bbox + alpha * residual
+        self.velocity = self.velocity + (beta / steps) * residual
+        self.detection = dict(detection)
+        self.hits += 1
+        self.misses = 0
+        self.steps_since_update = 0
+
+    def as_detection(self, predicted=False):
+        detection = dict(self.detection)
+        detection["bbox"] = [int(round(v)) for v in self.bbox]
+        detection["track_id"] = self.id
+        detection["track_age"] = self.age
+        detection["predicted"] = predicted
+        return detection
+
+
+class Tracker:
+    """
+    Per-camera IoU tracker that gives detections persistent track ids.
+
+    ``update`` matches a fresh detection list against the predicted tracks
+    (same type and class, greedy by IoU); ``predict`` advances every track
+    one frame without running detection, so inference can run only every
+    Nth frame while boxes keep moving in between.
+    """
+
+    def __init__(self, match_iou=0.3, max_misses=3, alpha=0.7, beta=0.3):
+        self.match_iou = match_iou
+        self.max_misses = max_misses
+        self.alpha = alpha
+        self.beta = beta
+        self.tracks = []
+        self._ids = count(1)
+
+    def predict(self):
+        """Propagate every track one frame and return them as detections"""
+        for track in self.tracks:
+            track.predict()
+        return [track.as_detection(predicted=True) for track in self.tracks if track.misses == 0]
+
+    def update(self, detections):
+        """Match a new detection list to the tracks and return the tracked detections"""
+        for track in self.tracks:
+            track.predict()
+
+        pairs = []
+        for t, track in enumerate(self.tracks):
+            for d, detection in enumerate(detections):
+                if track.detection["type"] != detection["type"] or track.detection["class"] != detection["class"]:
+                    continue
+                overlap = box_iou(track.bbox, detection["bbox"])
+                if overlap >= self.match_iou:
+                    pairs.append((overlap, t, d))
+
+        matched_tracks, matched_detections = set(), set()
+        for _, t, d in sorted(pairs, reverse=True):
+            if t in matched_tracks or d in matched_detections:
+                continue
+            self.tracks[t].correct(detections[d], self.alpha, self.beta)
+            matched_tracks.add(t)
+            matched_detections.add(d)
+
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.misses += 1
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+
+        for d, detection in enumerate(detections):
+            if d not in matched_detections:
+                self.tracks.append(Track(next(self._ids), detection))
+
+        return [track.as_detection() for track in self.tracks if track.misses == 0]
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import CameraListView
+from .views import CameraListView, ModelStatusView
 
 urlpatterns = [
     path("cameras/", CameraListView.as_view(), name="camera-list"),
+    path("models/status/", ModelStatusView.as_view(), name="model-status"),
 ]
@@ -1,7 +1,74 @@
-from rest_framework import generics
+from django.conf import settings
+from rest_framework import generics, status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .batcher import get_batcher
+from .executor import executor_stats
+from .gating import gate_stats
+from .hub import get_hub
 from .models import Camera
+from .registry import get_registry
 from .serializers import CameraSerializer
 
 class CameraListView(generics.ListCreateAPIView):
     queryset = Camera.objects.all()
     serializer_class = CameraSerializer
+
+
+def process_mode():
+    """Whether frames are served by worker processes that load their own models."""
+    return getattr(settings, "CAMERA_INFERENCE_MODE", "thread") == "process"
+
+
+def pipeline_stats():
+    """Counters of this process's frame pipeline, reported alongside the models."""
+    return {
+        "gates": gate_stats(),
+        "executor": executor_stats(),
+        "batcher": get_batcher().stats(),
+        "hub": get_hub().stats(),
+    }
+
+
+class ModelStatusView(APIView):
+    """
+    Readiness of the streaming YOLO models, plus the frame pipeline counters
+    under ``"pipeline"``; POST hot-swaps a model's weights.
+
+    In process mode (CAMERA_INFERENCE_MODE) the models live in the inference
+    worker processes, not in this one, so their status can't be reported
+    here and a hot-swap could not reach them: it is rejected with 409.
+    """
+
+    def get_permissions(self):
+        if self.request.method == "POST":
+            return [IsAdminUser()]
+        return []
+
+    def get(self, request):
+        if process_mode():
+            return Response({
+                "ready": None,
+                "mode": "process",
+                "models": "loaded by each inference worker process",
+                "pipeline": pipeline_stats(),
+            })
+        registry = get_registry()
+        return Response(
+            {**registry.status(), "pipeline": pipeline_stats()},
+            status=status.HTTP_200_OK if registry.ready() else status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    def post(self, request):
+        if process_mode():
+            return Response(
+                {"error": "Hot-swap is not supported with CAMERA_INFERENCE_MODE=\"process\"; restart the workers to load new weights"},
+                status=status.HTTP_409_CONFLICT
+            )
+        registry = get_registry()
+        name = request.data.get("model")
+        if name not in registry.specs:
+            return Response({"error": f"Unknown model: {name}"}, status=400)
+        registry.reload(name, request.data.get("weights"))
+        return Response(registry.status(), status=status.HTTP_202_ACCEPTED)
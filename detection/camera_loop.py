@@ -15,11 +15,13 @@ def start_camera_detection():
         if not ret:
             continue
 
-        # Save current frame
-        cv2.imwrite("current_frame.jpg", frame)
+        # Encode current frame in memory
+        ok, buf = cv2.imencode(".jpg", frame)
+        if not ok:
+            continue
 
         # Call detection
-        result = detect_mask("current_frame.jpg")
+        result = detect_mask(buf.tobytes())
         print("Detection:", result)
 
         # Sleep so you don't spam API
@@ -37,9 +39,11 @@ def start_knife_detection():
         if not ret:
             continue
 
-        cv2.imwrite("current_frame.jpg", frame)
+        ok, buf = cv2.imencode(".jpg", frame)
+        if not ok:
+            continue
 
-        result = detect_knife("current_frame.jpg")
+        result = detect_knife(buf.tobytes())
         print("Knife Detection:", result)
 
         time.sleep(1)
\ No newline at end of file
@@ -0,0 +1,212 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+from detection.services.client import infer, read_image
+from detection.services.upload import get_upload_config, prepare_upload, scale_predictions
+
+
+# HTTP detector -> (camera registry model, detection type kept from it; None keeps every class)
+LOCAL_MODELS = {
+    "knife": ("weapon", "knife"),
+    "gun": ("weapon", "gun"),
+    "mask": ("face_mask", None),
+}
+
+
+def normalize(result, source):
+    """
+    Bring a detector response into the Roboflow object-detection schema:
+    ``{"predictions": [{"x", "y", "width", "height", "confidence", "class", ...}], ...}``
+    with centre-based boxes, plus ``"source": "local" | "remote"``.
+    Classification-style fields (``predicted_class`` / ``confidence_score``)
+    are mapped onto ``class`` / ``confidence``.
+    """
+    if not isinstance(result, dict):
+        return {"error": f"Unexpected {source} response: {type(result).__name__}", "predictions": [], "source": source}
+    predictions = []
+    for pred in result.get("predictions", []) or []:
+        if isinstance(pred, dict):
+            pred = dict(pred)
+            pred.setdefault("class", pred.get("predicted_class", ""))
+            pred.setdefault("confidence", pred.get("confidence_score", 0))
+        predictions.append(pred)
+    return {**result, "predictions": predictions, "source": source}
+
+
+def detect_remote(model, image):
+    """
+    Roboflow over HTTP (see ``client.infer``). Unless DETECTION_UPLOAD_ENABLED
+    is off, the frame is first downscaled and re-encoded for the model
+    (``upload.prepare_upload``) and the boxes are mapped back afterwards.
+    """
+    data = read_image(image)
+    if not getattr(settings, "DETECTION_UPLOAD_ENABLED", True):
+        return normalize(infer(model, data), "remote")
+
+    config = get_upload_config(model)
+    # run_detectors prepares each upload once per request (upload.prepare_uploads)
+    prepared = getattr(data, "uploads", {}).get(config)
+    upload, scale = prepared or prepare_upload(data, *config)
+    result = normalize(scale_predictions(infer(model, upload), scale), "remote")
+    result["upload"] = {"bytes": len(upload), "original_bytes": len(data), "scale": round(scale, 4)}
+    return result
+
+
+class _SharedRuns:
+    """
+    Single-flight memo for local model runs. knife and gun are both served
+    by the weapon model; when ``run_detectors`` hands the same image bytes
+    to both, the second caller waits for the first run instead of
+    predicting again. Entries hold a reference to the image, so keying on
+    its ``id`` is safe while they live.
+    """
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._runs = OrderedDict()  # (registry model, id(image)) -> (image, Future)
+        self._lock = threading.Lock()
+
+    def get(self, registry_name, image, run):
+        key = (registry_name, id(image))
+        with self._lock:
+            entry = self._runs.get(key)
+            if entry is not None and entry[0] is image:
+                future, owner = entry[1], False
+            else:
+                future, owner = Future(), True
+                self._runs[key] = (image, future)
+                while len(self._runs) > self.max_entries:
+                    self._runs.popitem(last=False)
+        if owner:
+            try:
+                future.set_result(run())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+
+_shared_runs = _SharedRuns()
+
+
+def _run_local(registry_name, data):
+    """Decode ``data`` and run ``registry_name`` once over it at its lowest class threshold."""
+    from cameras.inference import CONFIDENCE_THRESHOLDS, preprocess, run_model
+
+    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Could not decode image")
+    conf = min(
+        CONFIDENCE_THRESHOLDS.get(detection_type or registry_name, 0.5)
+        for name, detection_type in LOCAL_MODELS.values()
+        if name == registry_name
+    )
+    batch, transforms = preprocess([frame])
+    results, names, _ = run_model(registry_name, batch, conf)
+    return results[0], names, transforms[0], frame.shape
+
+
+def detect_local(model, image):
+    """
+    Run one of the consumer's YOLO models (``cameras.registry``) in process.
+    Models shared between detectors (knife and gun) run once per image and
+    are split by ``classify_detection``.
+    Raises if the model has no local counterpart or cannot be loaded.
+    """
+    if model not in LOCAL_MODELS:
+        raise ValueError(f"No local model for {model}")
+    # Imported lazily so remote-only deployments never load the YOLO stack
+    from cameras.inference import CONFIDENCE_THRESHOLDS, unletterbox, classify_detection
+
+    started = time.perf_counter()
+    data = read_image(image)
+    registry_name, detection_type = LOCAL_MODELS[model]
+    boxes, names, transform, shape = _shared_runs.get(
+        registry_name, data, lambda: _run_local(registry_name, data)
+    )
+    threshold = CONFIDENCE_THRESHOLDS.get(detection_type or registry_name, 0.5)
+
+    predictions = []
+    for box in boxes:
+        class_name = names[int(box[5])]
+        if float(box[4]) < threshold:
+            continue
+        if detection_type is not None and classify_detection(class_name) != detection_type:
+            continue
+        x1, y1, x2, y2 = unletterbox(box[:4], transform, shape)
+        predictions.append({
+            "x": (x1 + x2) / 2,
+            "y": (y1 + y2) / 2,
+            "width": x2 - x1,
+            "height": y2 - y1,
+            "confidence": round(float(box[4]), 3),
+            "class": class_name,
+            "class_id": int(box[5]),
+        })
+
+    return {
+        "predictions": predictions,
+        "image": {"width": shape[1], "height": shape[0]},
+        "time": round(time.perf_counter() - started, 4),
+        "source": "local",
+    }
+
+
+def detect_local_only(model, image):
+    try:
+        return detect_local(model, image)
+    except Exception as e:
+        print(f"❌ Local {model} detection failed: {e}")
+        return {"error": str(e), "predictions": [], "source": "local"}
+
+
+def detect_local_first(model, image):
+    """
+    The local model when it is loaded, Roboflow otherwise. A model that is
+    not loaded yet is loaded in the background rather than inside the
+    request, which would blow the detector deadline.
+    """
+    if model in LOCAL_MODELS:
+        from cameras.registry import get_registry
+
+        registry = get_registry()
+        if not registry.ready(LOCAL_MODELS[model][0]):
+            registry.preload()
+            return detect_remote(model, image)
+        try:
+            return detect_local(model, image)
+        except Exception as e:
+            print(f"⚠️ Local {model} detection failed, falling back to remote: {e}")
+    return detect_remote(model, image)
+
+
+BACKENDS = {
+    "remote": detect_remote,
+    "local": detect_local_only,
+    "local_first": detect_local_first,
+}
+
+
+def backend_name(model):
+    return getattr(settings, "DETECTION_BACKENDS", {}).get(model, "remote")
+
+
+def get_backend(model):
+    """The detect function configured for ``model`` in settings.DETECTION_BACKENDS."""
+    name = backend_name(model)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown detection backend {name!r} for {model}; expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]
+
+
+def detect(model, image):
+    """
+    Detect with whichever backend serves ``model``. Always returns a dict in
+    the normalized schema; failures come back as ``{"error": ..., "predictions": []}``.
+    """
+    return get_backend(model)(model, image)
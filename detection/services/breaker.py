@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+
+class CircuitBreaker:
+    """
+    Per-model circuit breaker for the remote detectors.
+
+    The outcome and latency of the last ``window`` calls are kept. Once at
+    least ``min_calls`` are recorded and either the failure rate reaches
+    ``error_rate`` or the share of calls slower than ``slow_call`` seconds
+    reaches ``slow_rate``, the breaker opens and calls fail fast for
+    ``open_seconds``. It then lets a single probe through (half-open): a
+    healthy probe closes it, a failed one opens it again.
+
+    The latencies of recent successful calls also feed ``percentile``,
+    which the client uses to decide when to hedge a slow request.
+    """
+
+    def __init__(self, window=20, min_calls=10, error_rate=0.5, slow_call=5.0, slow_rate=0.5, open_seconds=30.0):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self.opened_at = None
+        self.trips = 0
+        self.rejected = 0
+        self._calls = deque(maxlen=window)  # (ok, elapsed seconds)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go out now; False means fail fast."""
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open":
+                if self._probing:
+                    self.rejected += 1
+                    return False
+                self._probing = True
+            return True
+
+    def retry_in(self):
+        """Seconds until an open breaker lets a probe through."""
+        with self._lock:
+            if self.state != "open":
+                return 0.0
+            return max(self.open_seconds - (time.monotonic() - self.opened_at), 0.0)
+
+    def record(self, ok, elapsed):
+        with self._lock:
+            healthy = ok and elapsed < self.slow_call
+            if self.state == "half_open":
+                self._probing = False
+                if healthy:
+                    self.state = "closed"
+                    self._calls.clear()
+                else:
+                    self._open()
+                    return
+            self._calls.append((ok, elapsed))
+            if self.state == "closed" and len(self._calls) >= self.min_calls:
+                failures = sum(1 for call_ok, _ in self._calls if not call_ok)
+                slow = sum(1 for _, call_elapsed in self._calls if call_elapsed >= self.slow_call)
+                if failures / len(self._calls) >= self.error_rate or slow / len(self._calls) >= self.slow_rate:
+                    self._open()
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.trips += 1
+
+    def percentile(self, p, min_samples=1):
+        """The ``p``th percentile latency of recent successful calls, or None."""
+        with self._lock:
+            latencies = sorted(elapsed for ok, elapsed in self._calls if ok)
+        if len(latencies) < max(min_samples, 1):
+            return None
+        index = min(int(round(p / 100 * (len(latencies) - 1))), len(latencies) - 1)
+        return latencies[index]
+
+    def stats(self):
+        with self._lock:
+            calls = len(self._calls)
+            failures = sum(1 for ok, _ in self._calls if not ok)
+            return {
+                "state": self.state,
+                "calls": calls,
+                "error_rate": round(failures / calls, 3) if calls else 0.0,
+                "trips": self.trips,
+                "rejected": self.rejected,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(model):
+    """The process-wide breaker for ``model``, or None when breakers are disabled."""
+    if not getattr(settings, "DETECTION_BREAKER_ENABLED", True):
+        return None
+    with _breakers_lock:
+        if model not in _breakers:
+            _breakers[model] = CircuitBreaker(
+                window=getattr(settings, "DETECTION_BREAKER_WINDOW", 20),
+                min_calls=getattr(settings, "DETECTION_BREAKER_MIN_CALLS", 10),
+                error_rate=getattr(settings, "DETECTION_BREAKER_ERROR_RATE", 0.5),
+                slow_call=getattr(settings, "DETECTION_BREAKER_SLOW_CALL", 5.0),
+                slow_rate=getattr(settings, "DETECTION_BREAKER_SLOW_RATE", 0.5),
+                open_seconds=getattr(settings, "DETECTION_BREAKER_OPEN_SECONDS", 30.0),
+            )
+        return _breakers[model]
+
+
+def breaker_stats():
+    with _breakers_lock:
+        return {model: breaker.stats() for model, breaker in _breakers.items()}
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+
+def perceptual_hash(image_bytes):
+    """
+    64-bit DCT perceptual hash of an encoded image.
+    Returns None if the bytes cannot be decoded as an image.
+    """
+    buf = np.frombuffer(image_bytes, np.uint8)
+    # A quarter-scale grayscale decode is plenty for a 32x32 thumbnail
+    gray = cv2.imdecode(buf, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if gray is None:
+        return None
+    thumb = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(thumb)[:8, :8]
+    bits = (low > np.median(low)).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class ResultCache:
+    """
+    LRU cache of detector responses keyed by (camera, model, perceptual hash).
+    A lookup matches any unexpired entry of the same camera and model whose
+    hash is within ``tolerance`` bits of the query.
+    """
+
+    def __init__(self, max_entries=1024, ttl=5.0, tolerance=4):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.tolerance = tolerance
+        self._entries = OrderedDict()  # (camera_id, model, phash) -> (stored_at, result)
+        self._scopes = {}  # (camera_id, model) -> set of phashes
+        self._stats = {}  # model -> {"hits": n, "misses": n}
+        self._lock = threading.Lock()
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        scope = self._scopes.get(key[:2])
+        if scope is not None:
+            scope.discard(key[2])
+            if not scope:
+                del self._scopes[key[:2]]
+
+    def _count(self, model, outcome):
+        self._stats.setdefault(model, {"hits": 0, "misses": 0})[outcome] += 1
+
+    def get(self, camera_id, model, phash):
+        now = time.monotonic()
+        with self._lock:
+            best = None
+            for cached_hash in list(self._scopes.get((camera_id, model), ())):
+                key = (camera_id, model, cached_hash)
+                stored_at, result = self._entries[key]
+                if now - stored_at > self.ttl:
+                    self._remove(key)
+                    continue
+                distance = hamming_distance(cached_hash, phash)
+                if distance <= self.tolerance and (best is None or distance < best[0]):
+                    best = (distance, key, result)
+
+            if best is None:
+                self._count(model, "misses")
+                return None
+
+            self._entries.move_to_end(best[1])
+            self._count(model, "hits")
+            return dict(best[2])
+
+    def put(self, camera_id, model, phash, result):
+        key = (camera_id, model, phash)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            self._scopes.setdefault(key[:2], set()).add(phash)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self):
+        with self._lock:
+            hits = sum(s["hits"] for s in self._stats.values())
+            misses = sum(s["misses"] for s in self._stats.values())
+            lookups = hits + misses
+            return {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "models": {model: dict(s) for model, s in self._stats.items()},
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Process-wide result cache, or None when disabled in settings."""
+    global _cache
+    if not getattr(settings, "DETECTION_CACHE_ENABLED", True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(
+                max_entries=getattr(settings, "DETECTION_CACHE_MAX_ENTRIES", 1024),
+                ttl=getattr(settings, "DETECTION_CACHE_TTL", 5.0),
+                tolerance=getattr(settings, "DETECTION_CACHE_TOLERANCE", 4),
+            )
+    return _cache
@@ -0,0 +1,208 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from detection.services.breaker import get_breaker
+
+
+# Statuses worth another attempt: rate limiting and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+_hedge_executor = None
+
+
+def get_model_config(model):
+    """Return the Roboflow model ID, API key and timeout configured for ``model``."""
+    config = dict(settings.ROBOFLOW_MODELS[model])
+    config.setdefault("api_key", settings.ROBOFLOW_API_KEY)
+    return config
+
+
+def get_deadline(model):
+    """Seconds a model may take before its result is dropped from the response."""
+    deadlines = getattr(settings, "DETECTION_MODEL_DEADLINES", {})
+    return deadlines.get(model, getattr(settings, "DETECTION_MODEL_DEADLINE", 10.0))
+
+
+def get_session():
+    """
+    Process-wide keep-alive session for detect.roboflow.com.
+    The pool is sized to the detector thread count so concurrent calls never
+    have to open a fresh TCP+TLS connection.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            pool_size = getattr(settings, "DETECTION_HTTP_POOL_SIZE", None) or getattr(settings, "DETECTION_WORKERS", 8)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff."""
+    base = getattr(settings, "DETECTION_HTTP_BACKOFF", 0.2)
+    time.sleep(random.uniform(0, base * (2 ** attempt)))
+
+
+def read_image(image):
+    """
+    Return the encoded image as bytes.
+    Accepts raw bytes, a readable buffer (e.g. an uploaded file) or a file path.
+    """
+    if isinstance(image, bytes):
+        return image
+    if isinstance(image, (bytearray, memoryview)):
+        return bytes(image)
+    if hasattr(image, "read"):
+        if hasattr(image, "seek"):
+            image.seek(0)
+        return image.read()
+    with open(image, "rb") as img:
+        return img.read()
+
+
+def get_hedge_executor():
+    """Threads that carry hedged requests: the original and its backup race here."""
+    global _hedge_executor
+    with _session_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(
+                max_workers=2 * getattr(settings, "DETECTION_WORKERS", 8),
+                thread_name_prefix="detector-hedge",
+            )
+    return _hedge_executor
+
+
+def _hedge_delay(breaker):
+    """Seconds after which a backup request is sent, or None when hedging is off."""
+    percentile = getattr(settings, "DETECTION_HEDGE_PERCENTILE", None)
+    if not percentile or breaker is None:
+        return None
+    return breaker.percentile(percentile, min_samples=getattr(settings, "DETECTION_HEDGE_MIN_SAMPLES", 20))
+
+
+def _send(session, url, params, data, timeout, hedge_after=None):
+    """
+    POST the image once. With ``hedge_after``, a second identical request is
+    fired if the first has not answered by then, and whichever response
+    arrives first is used; the slower one finishes in the background.
+    """
+    post = lambda: session.post(url, params=params, files={"file": ("image.jpg", data)}, timeout=timeout)
+    if hedge_after is None:
+        return post()
+
+    executor = get_hedge_executor()
+    primary = executor.submit(post)
+    done, _ = wait([primary], timeout=hedge_after)
+    if done:
+        return primary.result()
+
+    pending = {primary, executor.submit(post)}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                return future.result()
+            except requests.exceptions.RequestException as e:
+                error = e
+    raise error
+
+
+def _within(timeout, remaining):
+    """Cut a requests ``timeout`` (seconds or ``(connect, read)``) to ``remaining`` seconds."""
+    if isinstance(timeout, (tuple, list)):
+        return tuple(min(part, remaining) for part in timeout)
+    return min(timeout, remaining)
+
+
+def _circuit_open(model, breaker):
+    return {
+        "error": f"{model} detector circuit open",
+        "predictions": [],
+        "circuit_open": True,
+        "retry_in": round(breaker.retry_in(), 1),
+    }
+
+
+def infer(model, image, timeout=None):
+    """
+    Send an image to the Roboflow model registered as ``model``.
+    ``image`` is anything ``read_image`` accepts; it is read once, up front,
+    so the same buffer can be handed to every model and every retry.
+
+    Always returns a dict; failures come back as
+    ``{"error": ..., "predictions": []}`` rather than raising. While the
+    model's circuit breaker is open the call fails fast and the dict also
+    carries ``"circuit_open": True``.
+
+    Attempts and retries share the model's deadline (``get_deadline``): each
+    attempt's timeout is cut to what is left of it and no retry starts once
+    it has passed, so a call never outlives the result it would feed.
+    """
+    config = get_model_config(model)
+    url = f"{settings.ROBOFLOW_API_URL.rstrip('/')}/{config['model_id']}"
+    params = {"api_key": config["api_key"]}
+    timeout = timeout or config.get("timeout") or getattr(settings, "DETECTION_HTTP_TIMEOUT", (3.05, 10))
+    retries = getattr(settings, "DETECTION_HTTP_RETRIES", 2)
+    session = get_session()
+    breaker = get_breaker(model)
+    data = read_image(image)
+    deadline_at = time.monotonic() + get_deadline(model)
+
+    error = "Unknown error"
+    attempts = 0
+    for attempt in range(retries + 1):
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            error = "Deadline exceeded"
+            break
+        if breaker is not None and not breaker.allow():
+            return _circuit_open(model, breaker)
+
+        attempts += 1
+        started = time.monotonic()
+        response = None
+        try:
+            response = _send(session, url, params, data, _within(timeout, remaining), hedge_after=_hedge_delay(breaker))
+        except requests.exceptions.Timeout:
+            error = "API timeout"
+        except requests.exceptions.ConnectionError as e:
+            error = str(e)
+        except requests.exceptions.RequestException as e:
+            if breaker is not None:
+                breaker.record(False, time.monotonic() - started)
+            return {"error": str(e), "predictions": []}
+
+        # Client errors (4xx other than 429) are not the provider's fault
+        if breaker is not None:
+            ok = response is not None and response.status_code not in RETRY_STATUSES
+            breaker.record(ok, time.monotonic() - started)
+
+        if response is not None:
+            if response.status_code == 200:
+                try:
+                    return response.json()
+                except ValueError:
+                    return {"error": "Invalid Roboflow response", "predictions": []}
+            error = f"API returned status {response.status_code}"
+            if response.status_code not in RETRY_STATUSES:
+                print(f"❌ {model} detection API error: {response.status_code} - {response.text[:200]}")
+                return {"error": error, "predictions": []}
+
+        if attempt < retries:
+            _backoff(attempt)
+
+    print(f"❌ {model} detection failed after {attempts} attempts: {error}")
+    return {"error": error, "predictions": []}
@@ -1,19 +1,10 @@
-import requests
+from detection.services.backends import detect
 
-ROBOFLOW_API_KEY = "nob2A5RQmN6iKyQFIsC5"
-MODEL_ID = "gun-detection-ghlzd/4"
-API_URL = f"https://detect.roboflow.com/{MODEL_ID}?api_key={ROBOFLOW_API_KEY}"
 
-
-def detect_gun(image_path: str):
+def detect_gun(image):
     """
-    Sends image to Roboflow Gun Detection model.
+    Sends image bytes, a buffer or a path to the Gun Detection model
+    (Roboflow or local, per settings.DETECTION_BACKENDS).
     Fully compatible with Python 3.13.
     """
-    with open(image_path, "rb") as img:
-        response = requests.post(API_URL, files={"file": img})
-
-    try:
-        return response.json()
-    except Exception:
-        return {"error": "Invalid Roboflow response"}
+    return detect("gun", image)
@@ -0,0 +1,230 @@
+import itertools
+import json
+import queue
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from detection.services.log_store import utcnow
+from detection.services.threats import analyze_image
+
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class JobQueueFull(Exception):
+    """Raised when too many detection jobs are already waiting."""
+
+
+class JobQueue:
+    """
+    Asynchronous threat detection: ``submit`` returns a job id at once and a
+    pool of worker threads drains a priority queue in the background, so web
+    workers are not held for the length of the remote inference calls.
+
+    Pending uploads are bounded both by count (``max_pending``) and by total
+    size (``max_pending_bytes``); past either, ``submit`` raises
+    ``JobQueueFull``. Lower priority values run first. A job submitted without an explicit
+    priority for a camera that reported a threat within ``recheck_window``
+    seconds is escalated to "high", so threat re-checks overtake routine
+    frames. Finished jobs are kept for ``result_ttl`` seconds; with the
+    "redis" store they are also mirrored to the channel-layer Redis so any
+    web worker can answer a poll. Results for camera jobs are pushed to the
+    ``camera_<id>`` channel group as a ``detection_result`` message.
+    """
+
+    KEY_PREFIX = "hawkshield:job:"
+
+    def __init__(self, workers=4, max_pending=1000, max_pending_bytes=256 * 1024 * 1024,
+                 result_ttl=300.0, recheck_window=10.0, store="memory"):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_pending_bytes = max_pending_bytes
+        self.result_ttl = result_ttl
+        self.recheck_window = recheck_window
+        self.store = store
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()  # FIFO within a priority
+        self._jobs = {}  # job id -> job dict
+        self._images = {}  # job id -> image bytes, until a worker picks it up
+        self._pending_bytes = 0  # total size of the images in _images
+        self._expires = {}  # job id -> monotonic time the finished job is forgotten
+        self._recent_threats = {}  # cameraId -> monotonic time of the last threat
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._threads = [
+            threading.Thread(target=self._run, name=f"detection-job-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _priority(self, camera_id, priority):
+        if priority is not None:
+            if priority not in PRIORITIES:
+                raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+            return priority
+        last_threat = self._recent_threats.get(camera_id) if camera_id else None
+        if last_threat is not None and time.monotonic() - last_threat < self.recheck_window:
+            return "high"
+        return "normal"
+
+    def submit(self, image, camera_id=None, camera_name="Unknown", models=None, priority=None):
+        """Queue an image for detection and return the new job."""
+        with self._lock:
+            self._prune()
+            if len(self._images) >= self.max_pending:
+                self.rejected += 1
+                raise JobQueueFull(f"{len(self._images)} detection jobs already pending")
+            if self._images and self._pending_bytes + len(image) > self.max_pending_bytes:
+                self.rejected += 1
+                raise JobQueueFull(f"{self._pending_bytes} bytes of detection jobs already pending")
+            priority = self._priority(camera_id, priority)
+            job = {
+                "jobId": uuid.uuid4().hex,
+                "status": "queued",
+                "priority": priority,
+                "cameraId": camera_id,
+                "cameraName": camera_name,
+                "models": models,
+                "submittedAt": utcnow().isoformat(),
+            }
+            self._jobs[job["jobId"]] = job
+            self._images[job["jobId"]] = image
+            self._pending_bytes += len(image)
+            self._queue.put((PRIORITIES[priority], next(self._seq), job["jobId"]))
+            snapshot = dict(job)
+        self._save(snapshot)
+        return snapshot
+
+    def get(self, job_id):
+        """The job's current state, or None if it is unknown or expired."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        if self.store == "redis":
+            try:
+                from backend.redis_client import get_redis_client
+
+                stored = get_redis_client().get(f"{self.KEY_PREFIX}{job_id}")
+                if stored is not None:
+                    return json.loads(stored)
+            except Exception as e:
+                print(f"Error reading detection job {job_id} from redis: {e}")
+        return None
+
+    def pending(self):
+        with self._lock:
+            return len(self._images)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._images),
+                "pending_bytes": self._pending_bytes,
+                "tracked": len(self._jobs),
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+
+    def _prune(self):
+        now = time.monotonic()
+        for job_id in [job_id for job_id, expires in self._expires.items() if expires <= now]:
+            del self._expires[job_id]
+            self._jobs.pop(job_id, None)
+
+    def _save(self, job):
+        if self.store != "redis":
+            return
+        try:
+            from backend.redis_client import get_redis_client
+
+            get_redis_client().set(f"{self.KEY_PREFIX}{job['jobId']}", json.dumps(job), ex=int(self.result_ttl))
+        except Exception as e:
+            print(f"Error saving detection job {job['jobId']} to redis: {e}")
+
+    def _update(self, job_id, **changes):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(changes)
+            if job["status"] in ("done", "error"):
+                self._expires[job_id] = time.monotonic() + self.result_ttl
+            snapshot = dict(job)
+        self._save(snapshot)
+        return snapshot
+
+    def _run(self):
+        while True:
+            _, _, job_id = self._queue.get()
+            with self._lock:
+                image = self._images.pop(job_id)
+                self._pending_bytes -= len(image)
+                job = dict(self._jobs[job_id])
+            self._update(job_id, status="running", startedAt=utcnow().isoformat())
+            try:
+                result = analyze_image(image, job["cameraId"], job["cameraName"], job["models"])
+            except Exception as e:
+                print(f"Error in detection job {job_id}: {e}")
+                with self._lock:
+                    self.failed += 1
+                job = self._update(job_id, status="error", error=str(e), finishedAt=utcnow().isoformat())
+            else:
+                with self._lock:
+                    self.completed += 1
+                    if result["has_threat"] and job["cameraId"]:
+                        self._recent_threats[job["cameraId"]] = time.monotonic()
+                job = self._update(job_id, status="done", result=result, finishedAt=utcnow().isoformat())
+            if job["cameraId"]:
+                self._push(job)
+
+    def _push(self, job):
+        """Deliver a finished job to the camera's websocket group."""
+        try:
+            from asgiref.sync import async_to_sync
+            from channels.layers import get_channel_layer
+
+            from cameras.broadcast import dumps
+
+            group = f"camera_{job['cameraId']}"
+            async_to_sync(get_channel_layer().group_send)(
+                group,
+                {
+                    "type": "detection_result",
+                    "group": group,  # lets each process's fan-out hub (cameras/hub.py) route it
+                    "text": dumps({"action": "detection_result", **job})
+                }
+            )
+        except Exception as e:
+            print(f"Error pushing detection job {job['jobId']}: {e}")
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Process-wide detection job queue; its workers start on first use."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                workers=getattr(settings, "DETECTION_JOB_WORKERS", 4),
+                max_pending=getattr(settings, "DETECTION_JOB_MAX_PENDING", 1000),
+                max_pending_bytes=getattr(settings, "DETECTION_JOB_MAX_PENDING_BYTES", 256 * 1024 * 1024),
+                result_ttl=getattr(settings, "DETECTION_JOB_RESULT_TTL", 300.0),
+                recheck_window=getattr(settings, "DETECTION_JOB_RECHECK_WINDOW", 10.0),
+                store=getattr(settings, "DETECTION_JOB_STORE", "memory"),
+            )
+    return _job_queue
+
+
+def job_queue_stats():
+    """Counters of the process-wide job queue, or None until the first job starts it."""
+    job_queue = _job_queue
+    return job_queue.stats() if job_queue is not None else None
@@ -1,20 +1,10 @@
-import requests
+from detection.services.backends import detect
 
-ROBOFLOW_API_KEY = "nob2A5RQmN6iKyQFIsC5"
-MODEL_ID = "hazard-detection-z59i7/10"
-API_URL = f"https://detect.roboflow.com/{MODEL_ID}?api_key={ROBOFLOW_API_KEY}"
 
-
-def detect_knife(image_path: str):
+def detect_knife(image):
     """
-    Sends image to Roboflow Knife Detection model.
+    Sends image bytes, a buffer or a path to the Knife Detection model
+    (Roboflow or local, per settings.DETECTION_BACKENDS).
     Fully compatible with Python 3.13.
     """
-
-    with open(image_path, "rb") as img:
-        response = requests.post(API_URL, files={"file": img})
-
-    try:
-        return response.json()
-    except Exception:
-        return {"error": "Invalid Roboflow response"}
+    return detect("knife", image)
@@ -0,0 +1,169 @@
+import base64
+import threading
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+
+# Every listing sorts newest first on (timestamp, _id); _id breaks timestamp ties
+LOG_INDEXES = [
+    [("cameraId", ASCENDING), ("type", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+    [("type", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+    [("timestamp", DESCENDING), ("_id", DESCENDING)],
+]
+
+MAX_PAGE_SIZE = 1000
+
+_indexed = set()
+_indexed_lock = threading.Lock()
+
+
+class InvalidQuery(ValueError):
+    """Raised for a malformed cursor, timestamp or filter in a log query."""
+
+
+def ensure_log_indexes(collection):
+    """Create the log indexes once per collection per process."""
+    key = (collection.database.name, collection.name)
+    with _indexed_lock:
+        if key in _indexed:
+            return
+        for keys in LOG_INDEXES:
+            collection.create_index(keys)
+        _indexed.add(key)
+
+
+def utcnow():
+    """Timestamp stored on new log entries (a native BSON date)."""
+    return datetime.now(timezone.utc)
+
+
+def parse_time(value):
+    """Parse an ISO 8601 timestamp into an aware UTC datetime."""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        raise InvalidQuery(f"Invalid timestamp: {value}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _as_utc(value):
+    # pymongo hands back naive UTC datetimes unless the client is tz_aware
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def isoformat_utc(value):
+    """ISO 8601 string with a Z suffix for a stored (possibly naive UTC) datetime."""
+    return _as_utc(value).isoformat().replace("+00:00", "Z")
+
+
+def encode_cursor(log):
+    raw = f"{_as_utc(log['timestamp']).isoformat()}|{log['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Return ``(timestamp, _id)`` from a cursor; a bare ISO timestamp is accepted too."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        timestamp, object_id = raw.split("|", 1)
+        return parse_time(timestamp), ObjectId(object_id)
+    except Exception:
+        return parse_time(token), None
+
+
+def _keyset(op, cursor):
+    timestamp, object_id = cursor
+    if object_id is None:
+        return {"timestamp": {op: timestamp}}
+    return {"$or": [
+        {"timestamp": {op: timestamp}},
+        {"timestamp": timestamp, "_id": {op: object_id}},
+    ]}
+
+
+def serialize_log(log):
+    log = dict(log)
+    if "_id" in log:
+        log["_id"] = str(log["_id"])
+    if isinstance(log.get("timestamp"), datetime):
+        log["timestamp"] = isoformat_utc(log["timestamp"])
+    return log
+
+
+def query_logs(collection, camera_id=None, log_type=None, since=None, until=None,
+               before=None, after=None, limit=100, fields=None):
+    """
+    Keyset-paginated log listing, newest first.
+
+    ``before``/``after`` are cursors from a previous page (``next_cursor`` /
+    ``prev_cursor``) or bare ISO timestamps; ``since``/``until`` bound the
+    time range; ``fields`` limits the returned fields. Returns
+    ``(logs, next_cursor, prev_cursor)``.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    clauses = []
+    if camera_id:
+        clauses.append({"cameraId": camera_id})
+    if log_type:
+        clauses.append({"type": log_type})
+
+    time_range = {}
+    if since:
+        time_range["$gte"] = parse_time(since)
+    if until:
+        time_range["$lt"] = parse_time(until)
+    if time_range:
+        clauses.append({"timestamp": time_range})
+
+    if before:
+        clauses.append(_keyset("$lt", decode_cursor(before)))
+    elif after:
+        clauses.append(_keyset("$gt", decode_cursor(after)))
+
+    query = {"$and": clauses} if len(clauses) > 1 else (clauses[0] if clauses else {})
+    projection = None
+    if fields:
+        # The cursor always needs timestamp and _id
+        projection = {field: 1 for field in fields}
+        projection["timestamp"] = 1
+
+    # Paging towards newer entries walks the index forwards, then flips back
+    direction = ASCENDING if after and not before else DESCENDING
+    logs = list(
+        collection.find(query, projection)
+        .sort([("timestamp", direction), ("_id", direction)])
+        .limit(limit)
+    )
+    if direction == ASCENDING:
+        logs.reverse()
+
+    next_cursor = encode_cursor(logs[-1]) if logs else None
+    prev_cursor = encode_cursor(logs[0]) if logs else None
+    return [serialize_log(log) for log in logs], next_cursor, prev_cursor
+
+
+def backfill_log_timestamps(collection, batch_size=1000):
+    """
+    One-off migration: convert legacy ISO string timestamps to BSON dates.
+    Run it with ``python manage.py backfill_log_timestamps``.
+    """
+    from pymongo import UpdateOne
+
+    converted = 0
+    while True:
+        batch = list(collection.find({"timestamp": {"$type": "string"}}, {"timestamp": 1}).limit(batch_size))
+        if not batch:
+            return converted
+        operations = []
+        for log in batch:
+            try:
+                timestamp = parse_time(log["timestamp"])
+            except InvalidQuery:
+                timestamp = None  # unparseable; null it so the loop terminates
+            operations.append(UpdateOne({"_id": log["_id"]}, {"$set": {"timestamp": timestamp}}))
+        collection.bulk_write(operations, ordered=False)
+        converted += len(operations)
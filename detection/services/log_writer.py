@@ -0,0 +1,177 @@
+import atexit
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from pymongo import UpdateOne
+
+from detection.services.log_store import ensure_log_indexes
+from detection.services.rollups import get_rollup_collection, rollup_increments
+
+
+class LogWriter:
+    """
+    Background writer for detection logs, camera counters and threat rollups.
+
+    Requests only append to in-memory buffers; a daemon thread flushes them
+    with one ``insert_many`` for log entries and one ``bulk_write`` for camera
+    updates whenever ``batch_size`` entries are pending or ``flush_interval``
+    seconds have passed. Repeated updates to the same camera, and to the same
+    rollup bucket, are merged into a single ``$inc``/``$set``. Whatever is
+    buffered is flushed on shutdown.
+    """
+
+    def __init__(self, logs_collection, camera_collection, rollup_collection=None,
+                 batch_size=200, flush_interval=1.0, max_queue=10000):
+        self.logs_collection = logs_collection
+        self.camera_collection = camera_collection
+        self.rollup_collection = rollup_collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._logs = deque(maxlen=max_queue)
+        self._cameras = {}  # cameraId -> {"threats": n, "lastSeen": iso timestamp}
+        self._rollups = {}  # (cameraId, granularity, bucket) -> {field: increment}
+        self._cond = threading.Condition()
+        self._closed = False
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write_log(self, entry):
+        with self._cond:
+            if len(self._logs) >= self.max_queue:
+                # Mongo is not keeping up; the deque sheds the oldest entry rather than grow forever
+                self.dropped += 1
+            self._logs.append(entry)
+            if len(self._logs) >= self.batch_size:
+                self._cond.notify()
+
+    def touch_camera(self, camera_id, last_seen, threat=False):
+        """Record that a camera was seen, counting a threat if there was one."""
+        with self._cond:
+            update = self._cameras.setdefault(camera_id, {"threats": 0})
+            update["lastSeen"] = last_seen
+            if threat:
+                update["threats"] += 1
+
+    def record_rollup(self, camera_id, threat_types, timestamp):
+        """Count one analyzed frame in the camera's minute/hour/day rollups."""
+        if self.rollup_collection is None:
+            return
+        with self._cond:
+            for key, inc in rollup_increments(camera_id, threat_types, timestamp):
+                pending = self._rollups.setdefault(key, {})
+                for field, value in inc.items():
+                    pending[field] = pending.get(field, 0) + value
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._logs) + len(self._cameras) + len(self._rollups)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued_logs": len(self._logs),
+                "queued_cameras": len(self._cameras),
+                "queued_rollups": len(self._rollups),
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+            }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._logs) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self):
+        """Write out everything buffered so far."""
+        with self._cond:
+            logs = list(self._logs)
+            self._logs.clear()
+            cameras, self._cameras = self._cameras, {}
+            rollups, self._rollups = self._rollups, {}
+
+        if logs:
+            try:
+                self.logs_collection.insert_many(logs, ordered=False)
+                self.written += len(logs)
+            except Exception as e:
+                self.failed += len(logs)
+                print(f"Error writing {len(logs)} detection logs: {e}")
+
+        if cameras:
+            operations = []
+            for camera_id, update in cameras.items():
+                change = {"$set": {"lastSeen": update["lastSeen"]}}
+                if update["threats"]:
+                    change["$inc"] = {"threats": update["threats"]}
+                operations.append(UpdateOne({"cameraId": camera_id}, change))
+            try:
+                self.camera_collection.bulk_write(operations, ordered=False)
+            except Exception as e:
+                self.failed += len(operations)
+                print(f"Error updating {len(operations)} cameras: {e}")
+
+        if rollups:
+            operations = [
+                UpdateOne(
+                    {"cameraId": camera_id, "granularity": granularity, "bucket": bucket},
+                    {"$inc": inc},
+                    upsert=True
+                )
+                for (camera_id, granularity, bucket), inc in rollups.items()
+            ]
+            try:
+                self.rollup_collection.bulk_write(operations, ordered=False)
+            except Exception as e:
+                self.failed += len(operations)
+                print(f"Error updating {len(operations)} threat rollups: {e}")
+
+    def close(self, timeout=10):
+        """Stop the writer thread and flush what is buffered."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        started = time.monotonic()
+        self.flush()
+        print(f"Log writer flushed on shutdown in {time.monotonic() - started:.2f}s")
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer():
+    """Process-wide log writer for settings.LOGS_COLLECTION / CAMERA_COLLECTION."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            ensure_log_indexes(settings.LOGS_COLLECTION)
+            _writer = LogWriter(
+                settings.LOGS_COLLECTION,
+                settings.CAMERA_COLLECTION,
+                get_rollup_collection(),
+                batch_size=getattr(settings, "LOG_WRITER_BATCH_SIZE", 200),
+                flush_interval=getattr(settings, "LOG_WRITER_FLUSH_INTERVAL", 1.0),
+                max_queue=getattr(settings, "LOG_WRITER_MAX_QUEUE", 10000),
+            )
+            atexit.register(_writer.close)
+    return _writer
+
+
+def log_writer_stats():
+    """Counters of the process-wide log writer, or None until the first log creates it."""
+    writer = _writer
+    return writer.stats() if writer is not None else None
@@ -1,25 +1,17 @@
-import requests
+from detection.services.backends import detect
 
-ROBOFLOW_API_KEY = "nob2A5RQmN6iKyQFIsC5"
-MODEL_ID = "face-mask-detection-2gpmy/1"
-API_URL = f"https://detect.roboflow.com/{MODEL_ID}?api_key={ROBOFLOW_API_KEY}"
 
-
-def detect_mask(image_path: str):
+def detect_mask(image):
     """
-    Sends an image to Roboflow API and returns mask detection result.
+    Sends image bytes, a buffer or a path to the mask model (Roboflow or local,
+    per settings.DETECTION_BACKENDS) and returns mask detection result.
     Works with Python 3.13 (no inference-sdk needed).
     """
 
     try:
-        with open(image_path, "rb") as img:
-            response = requests.post(API_URL, files={"file": img}, timeout=15)
-        
-        if response.status_code != 200:
-            print(f"❌ Mask detection API error: {response.status_code} - {response.text[:200]}")
-            return {"error": f"API returned status {response.status_code}", "predictions": []}
-        
-        result = response.json()
+        result = detect("mask", image)
+        if isinstance(result, dict) and "error" in result:
+            return result
         
         # Log the response for debugging
         print(f"📦 Mask API Response Keys: {list(result.keys()) if isinstance(result, dict) else 'Not a dict'}")
@@ -32,12 +24,6 @@ def detect_mask(image_path: str):
             print(f"⚠️ No 'predictions' key in response. Full response: {str(result)[:300]}")
         
         return result
-    except requests.exceptions.Timeout:
-        print("Mask detection API timeout")
-        return {"error": "API timeout", "predictions": []}
-    except requests.exceptions.RequestException as e:
-        print(f"Mask detection API request error: {e}")
-        return {"error": str(e), "predictions": []}
     except Exception as e:
         print(f"Mask detection error: {e}")
         return {"error": str(e), "predictions": []}
@@ -0,0 +1,101 @@
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from pymongo import ASCENDING
+
+from detection.services.log_store import isoformat_utc, utcnow
+
+
+THREAT_TYPES = ["Knife", "Gun", "Face Mask", "Angry Person"]
+
+# Bucket start for each granularity, and the default window served by the stats endpoint
+GRANULARITIES = {
+    "minute": (lambda ts: ts.replace(second=0, microsecond=0), timedelta(hours=1)),
+    "hour": (lambda ts: ts.replace(minute=0, second=0, microsecond=0), timedelta(days=1)),
+    "day": (lambda ts: ts.replace(hour=0, minute=0, second=0, microsecond=0), timedelta(days=30)),
+}
+
+_indexed = False
+_indexed_lock = threading.Lock()
+
+
+def get_rollup_collection():
+    """settings.ROLLUPS_COLLECTION, or "threat_rollups" next to the logs collection."""
+    global _indexed
+    collection = getattr(settings, "ROLLUPS_COLLECTION", None)
+    if collection is None:
+        collection = settings.LOGS_COLLECTION.database["threat_rollups"]
+    with _indexed_lock:
+        if not _indexed:
+            collection.create_index(
+                [("cameraId", ASCENDING), ("granularity", ASCENDING), ("bucket", ASCENDING)],
+                unique=True,
+            )
+            collection.create_index([("granularity", ASCENDING), ("bucket", ASCENDING)])
+            _indexed = True
+    return collection
+
+
+def rollup_increments(camera_id, threat_types, timestamp):
+    """
+    The ``$inc`` to apply to each of the camera's minute/hour/day buckets for
+    one analyzed frame. Returns ``[((cameraId, granularity, bucket), inc), ...]``.
+    """
+    inc = {"frames": 1}
+    if threat_types:
+        inc["threats"] = 1
+        for threat_type in threat_types:
+            inc[f"counts.{threat_type}"] = 1
+    return [
+        ((camera_id, granularity, bucket_start(timestamp)), inc)
+        for granularity, (bucket_start, _) in GRANULARITIES.items()
+    ]
+
+
+def query_rollups(granularity="hour", camera_id=None, since=None, until=None):
+    """
+    Rollup buckets in ``[since, until)``, oldest first. Without a camera the
+    buckets of all cameras are summed.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    bucket_start, default_window = GRANULARITIES[granularity]
+    until = until or (bucket_start(utcnow()) + _step(granularity))
+    since = since or (until - default_window)
+
+    collection = get_rollup_collection()
+    match = {"granularity": granularity, "bucket": {"$gte": bucket_start(since), "$lt": until}}
+    if camera_id:
+        match["cameraId"] = camera_id
+        buckets = collection.find(match, {"_id": 0, "granularity": 0}).sort("bucket", ASCENDING)
+        return [_bucket(doc) for doc in buckets]
+
+    group = {"_id": "$bucket", "frames": {"$sum": "$frames"}, "threats": {"$sum": "$threats"}}
+    for threat_type in THREAT_TYPES:
+        group[threat_type] = {"$sum": f"$counts.{threat_type}"}
+    buckets = collection.aggregate([{"$match": match}, {"$group": group}, {"$sort": {"_id": 1}}])
+    return [
+        _bucket({
+            "bucket": doc["_id"],
+            "frames": doc["frames"],
+            "threats": doc["threats"],
+            "counts": {threat_type: doc[threat_type] for threat_type in THREAT_TYPES},
+        })
+        for doc in buckets
+    ]
+
+
+def _bucket(doc):
+    counts = doc.get("counts", {})
+    return {
+        **({"cameraId": doc["cameraId"]} if "cameraId" in doc else {}),
+        "bucket": isoformat_utc(doc["bucket"]),
+        "frames": doc.get("frames", 0),
+        "threats": doc.get("threats", 0),
+        "counts": {threat_type: counts.get(threat_type, 0) for threat_type in THREAT_TYPES},
+    }
+
+
+def _step(granularity):
+    return {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1)}[granularity]
@@ -0,0 +1,176 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+
+from django.conf import settings
+
+from detection.services.cache import get_result_cache, perceptual_hash
+from detection.services.backends import backend_name
+from detection.services.breaker import breaker_stats
+from detection.services.client import get_deadline, read_image
+from detection.services.upload import prepare_uploads
+from detection.services.mask_detector import detect_mask
+from detection.services.knife_detector import detect_knife
+from detection.services.gun_detector import detect_gun
+from detection.services.emotion_detector import detect_emotion
+
+
+DETECTORS = {
+    "knife": detect_knife,
+    "gun": detect_gun,
+    "mask": detect_mask,
+    "emotion": detect_emotion,
+}
+
+_executor = None
+_batch_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide thread pool shared by every detection request."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "DETECTION_WORKERS", 8),
+                thread_name_prefix="detector",
+            )
+    return _executor
+
+
+def get_batch_executor():
+    """
+    Pool that runs whole images for batch requests. It is separate from the
+    detector pool because each image task blocks on its own detector futures;
+    its size caps how many images are in flight across all batch requests.
+    """
+    global _batch_executor
+    with _executor_lock:
+        if _batch_executor is None:
+            _batch_executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "DETECTION_BATCH_CONCURRENCY", 4),
+                thread_name_prefix="detector-batch",
+            )
+    return _batch_executor
+
+
+def _elapsed_ms(started):
+    return round((time.monotonic() - started) * 1000, 1)
+
+
+def _call(detector, image, started):
+    result = detector(image)
+    return result, _elapsed_ms(started)
+
+
+def run_detectors(image, models=None, camera_id=None):
+    """
+    Run the requested detectors concurrently against the same image
+    (bytes, a readable buffer or a path).
+
+    Returns ``(results, status)``. ``results`` maps every model that finished
+    within its deadline to its raw response; ``status`` maps every requested
+    model to ``{"status": "ok" | "error" | "timeout" | "circuit_open", "elapsed_ms": ...}``.
+    A model that misses its deadline keeps running in the background but is
+    left out of ``results``.
+
+    With a ``camera_id`` the perceptual-hash result cache is consulted first
+    and each status also carries ``"cache": "hit" | "miss"``. Models that
+    have called Roboflow also report their circuit breaker's
+    ``"breaker": "closed" | "open" | "half_open"``.
+    """
+    models = list(models or DETECTORS)
+    # Read the upload once; every detector thread shares the same bytes
+    image = read_image(image)
+    executor = get_executor()
+    started = time.monotonic()
+
+    results = {}
+    status = {}
+
+    cache = get_result_cache() if camera_id else None
+    phash = perceptual_hash(image) if cache else None
+    if phash is not None:
+        for model in models:
+            cached = cache.get(camera_id, model, phash)
+            if cached is not None:
+                results[model] = cached
+                status[model] = {"status": "ok", "elapsed_ms": 0.0, "cache": "hit"}
+
+    # Downscaled uploads for the remote detectors are prepared once here, not per model
+    remote = [
+        model for model in models
+        if model not in results and model in settings.ROBOFLOW_MODELS and backend_name(model) != "local"
+    ]
+    if remote and getattr(settings, "DETECTION_UPLOAD_ENABLED", True):
+        image = prepare_uploads(image, remote)
+
+    futures = {
+        model: executor.submit(_call, DETECTORS[model], image, started)
+        for model in models
+        if model not in results
+    }
+
+    # Collect in deadline order so the shortest deadline is honoured first
+    for model in sorted(futures, key=get_deadline):
+        remaining = started + get_deadline(model) - time.monotonic()
+        try:
+            result, elapsed_ms = futures[model].result(timeout=max(remaining, 0))
+        except FuturesTimeout:
+            status[model] = {"status": "timeout", "elapsed_ms": _elapsed_ms(started)}
+        except Exception as e:
+            status[model] = {"status": "error", "error": str(e), "elapsed_ms": _elapsed_ms(started)}
+        else:
+            results[model] = result
+            if isinstance(result, dict) and result.get("circuit_open"):
+                # Failed fast: the model's breaker is open after recent errors or slow calls
+                status[model] = {"status": "circuit_open", "retry_in": result.get("retry_in"), "elapsed_ms": elapsed_ms}
+            elif isinstance(result, dict) and result.get("error"):
+                status[model] = {"status": "error", "error": str(result["error"]), "elapsed_ms": elapsed_ms}
+            else:
+                status[model] = {"status": "ok", "elapsed_ms": elapsed_ms}
+                if phash is not None:
+                    cache.put(camera_id, model, phash, result)
+
+        if phash is not None:
+            status[model]["cache"] = "miss"
+
+    breakers = breaker_stats()
+    for model in models:
+        if model in breakers:
+            status[model]["breaker"] = breakers[model]["state"]
+
+    return results, status
+
+
+def run_batch(images, models=None, camera_ids=None):
+    """
+    Run ``run_detectors`` for several images concurrently, at most
+    DETECTION_BATCH_CONCURRENCY at a time.
+
+    Yields ``(index, results, status)`` for each image as soon as it
+    finishes, so the fastest images come first; an image whose detectors
+    raised yields ``(index, None, error)``. Images not started yet are
+    cancelled if the caller stops iterating.
+    """
+    camera_ids = camera_ids or []
+    executor = get_batch_executor()
+    futures = {
+        executor.submit(
+            run_detectors, image, models, camera_ids[index] if index < len(camera_ids) else None
+        ): index
+        for index, image in enumerate(images)
+    }
+    try:
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results, status = future.result()
+            except Exception as e:
+                yield index, None, str(e)
+            else:
+                yield index, results, status
+    finally:
+        for future in futures:
+            future.cancel()
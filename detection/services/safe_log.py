@@ -0,0 +1,61 @@
+import threading
+import time
+
+from django.conf import settings
+
+
+class SafeLogThrottle:
+    """
+    Decides when a camera's "safe" status is due to be logged again, without
+    asking Mongo for the last safe entry.
+
+    The "memory" backend keeps per-camera timestamps in this process; the
+    "redis" backend uses a ``SET NX PX`` key on the channel-layer Redis so all
+    workers share one throttle. ``should_log`` checks and claims the slot
+    atomically, so only one caller per interval gets True.
+    """
+
+    KEY_PREFIX = "hawkshield:safe_log:"
+
+    def __init__(self, interval=30.0, backend="memory"):
+        self.interval = interval
+        self.backend = backend
+        self._last = {}  # cameraId -> monotonic time of the last safe log
+        self._lock = threading.Lock()
+
+    def _should_log_memory(self, camera_id):
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(camera_id)
+            if last is not None and now - last < self.interval:
+                return False
+            self._last[camera_id] = now
+            return True
+
+    def should_log(self, camera_id):
+        if self.backend == "redis":
+            try:
+                from backend.redis_client import get_redis_client
+
+                return bool(get_redis_client().set(
+                    f"{self.KEY_PREFIX}{camera_id}", 1, nx=True, px=int(self.interval * 1000)
+                ))
+            except Exception as e:
+                print(f"Safe-log throttle falling back to memory: {e}")
+        return self._should_log_memory(camera_id)
+
+
+_throttle = None
+_throttle_lock = threading.Lock()
+
+
+def get_safe_log_throttle():
+    global _throttle
+    if _throttle is None:
+        with _throttle_lock:
+            if _throttle is None:
+                _throttle = SafeLogThrottle(
+                    interval=getattr(settings, "SAFE_LOG_INTERVAL", 30.0),
+                    backend=getattr(settings, "SAFE_LOG_BACKEND", "memory"),
+                )
+    return _throttle
@@ -0,0 +1,139 @@
+from detection.services.cache import get_result_cache
+from detection.services.log_store import utcnow
+from detection.services.log_writer import get_log_writer
+from detection.services.runner import run_detectors
+from detection.services.safe_log import get_safe_log_throttle
+
+
+ANGRY_WORDS = ["angry", "anger", "furious", "rage"]
+
+
+def _predictions(result):
+    return result.get("predictions", []) if isinstance(result, dict) else []
+
+
+def summarize_threats(results):
+    """
+    Turn raw detector responses (as returned by ``run_detectors``) into the
+    threat summary shared by the single-image and batch endpoints.
+    """
+    knife_preds = _predictions(results.get("knife", {}))
+    gun_preds = _predictions(results.get("gun", {}))
+    # Anything detected in front of a face counts as a mask
+    mask_preds = [pred for pred in _predictions(results.get("mask", {})) if isinstance(pred, dict)]
+    emotion_preds = _predictions(results.get("emotion", {}))
+
+    angry_emotions = []
+    for pred in emotion_preds:
+        if isinstance(pred, dict):
+            pred_class = pred.get("class", "").lower() or pred.get("predicted_class", "").lower()
+            if any(angry_word in pred_class for angry_word in ANGRY_WORDS):
+                angry_emotions.append(pred)
+
+    threat_types = []
+    if len(knife_preds) > 0:
+        threat_types.append("Knife")
+    if len(gun_preds) > 0:
+        threat_types.append("Gun")
+    if len(mask_preds) > 0:
+        threat_types.append("Face Mask")
+    if len(angry_emotions) > 0:
+        threat_types.append("Angry Person")
+
+    return {
+        "knife": knife_preds,
+        "gun": gun_preds,
+        "mask": mask_preds,
+        "emotion": emotion_preds,
+        "angry_emotions": angry_emotions,
+        "total_detections": len(knife_preds) + len(gun_preds) + len(mask_preds) + len(angry_emotions),
+        "has_threat": len(threat_types) > 0,
+        "threat_types": threat_types,
+    }
+
+
+def record_detection(camera_id, camera_name, summary):
+    """
+    Queue the camera counter, rollup and log entry for one analyzed frame on
+    the background log writer. Returns the writer's queue depth.
+    """
+    log_writer = get_log_writer()
+    now = utcnow()
+    has_threat = summary["has_threat"]
+    threat_types = summary["threat_types"]
+
+    # Update camera threat count and lastSeen
+    log_writer.touch_camera(camera_id, now.isoformat(), threat=has_threat)
+
+    # Per-camera minute/hour/day threat counts for the stats endpoint
+    log_writer.record_rollup(camera_id, threat_types, now)
+
+    if has_threat:
+        # Always log threats
+        log_writer.write_log({
+            "cameraId": camera_id,
+            "cameraName": camera_name,
+            "type": "threat",
+            "threatTypes": threat_types,
+            "timestamp": now,
+            "detections": {
+                "knife": len(summary["knife"]),
+                "gun": len(summary["gun"]),
+                "mask": len(summary["mask"]),
+                "angry_emotions": len(summary["angry_emotions"])
+            }
+        })
+    elif get_safe_log_throttle().should_log(camera_id):
+        # Log safe status only every SAFE_LOG_INTERVAL seconds to avoid spam
+        log_writer.write_log({
+            "cameraId": camera_id,
+            "cameraName": camera_name,
+            "type": "safe",
+            "timestamp": now
+        })
+
+    return log_writer.queue_depth()
+
+
+def threat_response(results, model_status, camera_id=None, camera_name="Unknown"):
+    """
+    The response body shared by ``/threats/``, ``/threats/batch/`` lines and
+    job results, built from ``run_detectors`` output. Frames that belong to
+    a camera are logged and report the result cache and log queue.
+    """
+    summary = summarize_threats(results)
+    print(
+        f"Detection results - Knife: {len(summary['knife'])}, Gun: {len(summary['gun'])}, "
+        f"Mask: {len(summary['mask'])}, Angry: {len(summary['angry_emotions'])}"
+    )
+    response = {key: value for key, value in summary.items() if key != "threat_types"}
+    response["threatTypes"] = summary["threat_types"]
+    response["models"] = model_status
+    if camera_id:
+        response["cameraId"] = camera_id
+        response["cameraName"] = camera_name
+
+        cache = get_result_cache()
+        if cache:
+            cache_status = [status.get("cache") for status in model_status.values()]
+            response["cache"] = {
+                "hits": cache_status.count("hit"),
+                "misses": cache_status.count("miss"),
+                "totals": cache.stats()
+            }
+
+        # Writes are buffered and flushed in bulk by the background log writer
+        try:
+            response["logQueueDepth"] = record_detection(camera_id, camera_name, summary)
+        except Exception as db_error:
+            print(f"Error updating database: {db_error}")
+    return response
+
+
+def analyze_image(image, camera_id=None, camera_name="Unknown", models=None):
+    """
+    Run the detectors on one image, each under its own deadline, and return
+    the ``/threats/`` response body.
+    """
+    results, model_status = run_detectors(image, models=models, camera_id=camera_id)
+    return threat_response(results, model_status, camera_id, camera_name)
@@ -0,0 +1,93 @@
+import cv2
+from django.conf import settings
+
+from cameras.decode import FrameDecoder, jpeg_size
+
+
+def get_upload_config(model):
+    """
+    Longest side and JPEG quality for frames uploaded to ``model``:
+    ``upload_size`` / ``upload_quality`` in its ROBOFLOW_MODELS entry, else
+    DETECTION_UPLOAD_SIZE / DETECTION_UPLOAD_QUALITY.
+    """
+    config = settings.ROBOFLOW_MODELS.get(model, {})
+    return (
+        config.get("upload_size", getattr(settings, "DETECTION_UPLOAD_SIZE", 640)),
+        config.get("upload_quality", getattr(settings, "DETECTION_UPLOAD_QUALITY", 80)),
+    )
+
+
+def prepare_upload(data, max_size=640, quality=80):
+    """
+    Downscale an encoded image so its longest side is at most ``max_size``
+    and re-encode it as JPEG at ``quality``.
+
+    Returns ``(bytes, scale)`` where ``scale`` maps coordinates on the
+    uploaded image back onto the original. Images that are already small
+    enough, can't be decoded, or would not get smaller are returned as-is
+    with a scale of 1.0.
+    """
+    size = jpeg_size(data)
+    if size is not None and max(size) <= max_size:
+        return data, 1.0
+
+    # Large JPEGs are decoded at a reduced libjpeg scale, close to the target
+    frame, scale = FrameDecoder(target_size=max_size).decode(data)
+    if frame is None:
+        return data, 1.0
+
+    # Scale by the longest side: the frame may be EXIF-rotated relative to the raw size
+    h, w = frame.shape[:2]
+    if max(h, w) > max_size:
+        ratio = max_size / max(h, w)
+        frame = cv2.resize(frame, (max(round(w * ratio), 1), max(round(h * ratio), 1)), interpolation=cv2.INTER_AREA)
+        scale *= max(h, w) / max(frame.shape[:2])
+
+    ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok or encoded.nbytes >= len(data):
+        return data, 1.0
+    return encoded.tobytes(), scale
+
+
+def scale_predictions(result, scale):
+    """Map Roboflow boxes (and polygon points) from the uploaded image back onto the original."""
+    if scale == 1.0 or not isinstance(result, dict):
+        return result
+    for pred in result.get("predictions", []) or []:
+        if not isinstance(pred, dict):
+            continue
+        for key in ("x", "y", "width", "height"):
+            if isinstance(pred.get(key), (int, float)):
+                pred[key] = round(pred[key] * scale, 1)
+        for point in pred.get("points", []) or []:
+            if isinstance(point, dict):
+                point["x"] = round(point.get("x", 0) * scale, 1)
+                point["y"] = round(point.get("y", 0) * scale, 1)
+    image = result.get("image")
+    if isinstance(image, dict):
+        for key in ("width", "height"):
+            if isinstance(image.get(key), (int, float)):
+                image[key] = round(image[key] * scale)
+    return result
+
+
+class PreparedImage(bytes):
+    """
+    Image bytes that also carry their upload versions, keyed by
+    ``(max_size, quality)``, so every remote detector of a request reuses
+    one downscale/re-encode pass (see ``prepare_uploads``).
+    """
+
+    uploads = {}
+
+
+def prepare_uploads(data, models):
+    """
+    Wrap ``data`` in a ``PreparedImage`` with one ``prepare_upload`` result
+    per distinct upload configuration among ``models``.
+    """
+    image = PreparedImage(data)
+    image.uploads = {}
+    for config in {get_upload_config(model) for model in models}:
+        image.uploads[config] = prepare_upload(data, *config)
+    return image
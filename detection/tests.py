@@ -1,3 +1,189 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+import cv2
+import numpy as np
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+
+from detection.services import breaker
+from detection.services.client import infer
+
+
+class StubRoboflow(BaseHTTPRequestHandler):
+    """Stand-in for detect.roboflow.com: answers with ``status`` after the next queued delay."""
+
+    status = 200
+    delays = []
+    requests = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        cls = type(self)
+        with cls.lock:
+            cls.requests += 1
+            delay = cls.delays.pop(0) if cls.delays else 0
+        time.sleep(delay)
+        body = b'{"predictions": []}' if cls.status == 200 else b'{"message": "unavailable"}'
+        try:
+            self.send_response(cls.status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client timed out or took the hedged response
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RemoteDetectorTestCase(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubRoboflow)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.settings_override = override_settings(
+            ROBOFLOW_API_URL=f"http://127.0.0.1:{cls.server.server_port}",
+            ROBOFLOW_MODELS={"stub": {"model_id": "stub/1", "api_key": "test"}},
+            DETECTION_HTTP_TIMEOUT=(1, 5),
+            DETECTION_HTTP_RETRIES=0,
+            DETECTION_BREAKER_ENABLED=True,
+            DETECTION_BREAKER_WINDOW=4,
+            DETECTION_BREAKER_MIN_CALLS=4,
+            DETECTION_BREAKER_ERROR_RATE=0.5,
+            DETECTION_BREAKER_SLOW_CALL=5.0,
+            DETECTION_BREAKER_OPEN_SECONDS=0.3,
+        )
+        # Enabled first, so the overrides on each test class take precedence
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubRoboflow.status = 200
+        StubRoboflow.delays = []
+        StubRoboflow.requests = 0
+        with breaker._breakers_lock:
+            breaker._breakers.clear()
+
+    def trip(self):
+        StubRoboflow.status = 503
+        for _ in range(4):
+            infer("stub", b"image")
+        self.assertEqual(breaker.get_breaker("stub").state, "open")
+
+
+class CircuitBreakerTests(RemoteDetectorTestCase):
+    def test_opens_after_failures_and_fails_fast(self):
+        self.trip()
+        result = infer("stub", b"image")
+        self.assertTrue(result["circuit_open"])
+        self.assertEqual(result["predictions"], [])
+        self.assertEqual(StubRoboflow.requests, 4)
+
+    def test_half_open_probe_closes_on_success(self):
+        self.trip()
+        time.sleep(0.35)
+        StubRoboflow.status = 200
+        result = infer("stub", b"image")
+        self.assertEqual(result, {"predictions": []})
+        self.assertEqual(breaker.get_breaker("stub").state, "closed")
+
+    def test_half_open_probe_reopens_on_failure(self):
+        self.trip()
+        time.sleep(0.35)
+        result = infer("stub", b"image")
+        self.assertNotIn("circuit_open", result)
+        self.assertEqual(StubRoboflow.requests, 5)
+        self.assertEqual(breaker.get_breaker("stub").state, "open")
+        self.assertEqual(breaker.get_breaker("stub").trips, 2)
+
+    def test_half_open_lets_a_single_probe_through(self):
+        self.trip()
+        time.sleep(0.35)
+        StubRoboflow.status = 200
+        StubRoboflow.delays = [0.3]
+        probe = threading.Thread(target=infer, args=("stub", b"image"))
+        probe.start()
+        time.sleep(0.1)
+        self.assertTrue(infer("stub", b"image")["circuit_open"])
+        probe.join()
+        self.assertEqual(StubRoboflow.requests, 5)
+
+
+@override_settings(DETECTION_HEDGE_PERCENTILE=50, DETECTION_HEDGE_MIN_SAMPLES=3)
+class HedgingTests(RemoteDetectorTestCase):
+    def warm_up(self, delay):
+        StubRoboflow.delays = [delay] * 3
+        for _ in range(3):
+            infer("stub", b"image")
+        StubRoboflow.requests = 0
+
+    def test_backup_request_sent_when_primary_is_slow(self):
+        self.warm_up(0.05)
+        StubRoboflow.delays = [2.0, 0]
+        started = time.monotonic()
+        result = infer("stub", b"image")
+        self.assertEqual(result, {"predictions": []})
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(StubRoboflow.requests, 2)
+
+    def test_no_backup_when_primary_answers_in_time(self):
+        self.warm_up(0.3)
+        result = infer("stub", b"image")
+        self.assertEqual(result, {"predictions": []})
+        time.sleep(0.4)
+        self.assertEqual(StubRoboflow.requests, 1)
+
+
+@override_settings(DETECTION_MODEL_DEADLINE=0.5, DETECTION_HTTP_RETRIES=2, DETECTION_HTTP_BACKOFF=0)
+class DeadlineTests(RemoteDetectorTestCase):
+    def test_attempts_share_the_model_deadline(self):
+        StubRoboflow.delays = [2.0, 2.0, 2.0]
+        started = time.monotonic()
+        result = infer("stub", b"image")
+        self.assertIn("error", result)
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(StubRoboflow.requests, 1)
+
+
+@override_settings(
+    ROBOFLOW_MODELS={model: {"model_id": f"{model}/1", "api_key": "test"} for model in ("knife", "gun", "mask", "emotion")},
+    DETECTION_BACKENDS={},
+)
+class BatchThreatsTests(RemoteDetectorTestCase):
+    def post_batch(self, **extra):
+        _, jpeg = cv2.imencode(".jpg", np.zeros((32, 32, 3), dtype=np.uint8))
+        images = [SimpleUploadedFile(f"frame{i}.jpg", jpeg.tobytes(), content_type="image/jpeg") for i in range(2)]
+        response = self.client.post("/api/detection/threats/batch/", {"images": images, **extra})
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    def assert_streamed(self, lines, models):
+        self.assertEqual(sorted(line["index"] for line in lines[:-1]), [0, 1])
+        for line in lines[:-1]:
+            self.assertNotIn("error", line)
+            self.assertEqual(sorted(line["models"]), sorted(models))
+        self.assertTrue(lines[-1]["done"])
+        self.assertEqual(lines[-1]["total_processed"], 2)
+
+    def test_every_model_by_default(self):
+        lines = self.post_batch()
+        self.assert_streamed(lines, ["knife", "gun", "mask", "emotion"])
+        self.assertEqual(StubRoboflow.requests, 8)
+
+    def test_requested_models_only(self):
+        lines = self.post_batch(models=["knife", "mask"])
+        self.assert_streamed(lines, ["knife", "mask"])
+        self.assertEqual(StubRoboflow.requests, 4)
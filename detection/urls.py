@@ -1,9 +1,16 @@
 from django.urls import path
-from .views import detect_mask_api, detect_threats, detect_emotion_api, get_logs
+from .views import (
+    detect_mask_api, detect_threats, detect_emotion_api, batch_detect_threats,
+    submit_threat_job, get_threat_job, get_logs, get_stats,
+)
 
 urlpatterns = [
     path("detect-mask/", detect_mask_api),
     path("threats/", detect_threats),
+    path("threats/batch/", batch_detect_threats),
+    path("threats/jobs/", submit_threat_job),
+    path("threats/jobs/<str:job_id>/", get_threat_job),
     path("emotion/", detect_emotion_api),
     path("logs/", get_logs),
+    path("stats/", get_stats),
 ]
\ No newline at end of file